@@ -0,0 +1,56 @@
+"""execution_log_string_task_id
+
+Revision ID: 5e2b9c7d41a3
+Revises: c4a956bf2970
+Create Date: 2026-10-17 12:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b9c7d41a3'
+down_revision: Union[str, None] = 'c4a956bf2970'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild(task_id_type: sa.types.TypeEngine, foreign_key: bool) -> None:
+    """Recreate execution_logs with the given task_id column and copy existing rows."""
+    task_id_args = [sa.ForeignKey('tasks.id')] if foreign_key else []
+    op.create_table('execution_logs_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', task_id_type, *task_id_args, nullable=True),
+    sa.Column('agent_id', sa.String(length=50), nullable=False),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO execution_logs_new (id, task_id, agent_id, action, result, created_at) "
+        f"SELECT id, CAST(task_id AS {task_id_type.compile(dialect=op.get_bind().dialect)}), "
+        "agent_id, action, result, created_at FROM execution_logs"
+    )
+    op.drop_table('execution_logs')
+    op.rename_table('execution_logs_new', 'execution_logs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # task_id holds controller task UUIDs, so it becomes a string without a foreign key.
+    # If the table does not exist, DatabaseManager creates it with the new schema.
+    if not sa.inspect(op.get_bind()).has_table('execution_logs'):
+        return
+    _rebuild(sa.String(length=36), foreign_key=False)
+    op.create_index('ix_execution_logs_task_id', 'execution_logs', ['task_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('execution_logs'):
+        return
+    op.drop_index('ix_execution_logs_task_id', table_name='execution_logs')
+    _rebuild(sa.Integer(), foreign_key=True)
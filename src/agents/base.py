@@ -4,6 +4,7 @@ from pydantic import BaseModel
 import asyncio
 import logging
 from datetime import datetime
+from src.common.events.event_bus import EventBus, EventTypes
 
 class AgentState(BaseModel):
     """代理状态模型"""
@@ -39,12 +40,20 @@ class BaseAgent(ABC):
         pass
 
     async def update_state(self, status: str, metadata: Dict[str, Any] = None) -> None:
-        """更新代理状态"""
+        """更新代理状态，状态变化时发布事件供监督代理增量更新"""
+        previous = self.state.status
         self.state.status = status
         self.state.last_update = datetime.now()
         if metadata:
             self.state.metadata.update(metadata)
         self.logger.info(f"Agent {self.agent_id} state updated: {status}")
+        if status != previous:
+            await EventBus().publish(EventTypes.AGENT_STATE_CHANGED, {
+                "agent_id": self.agent_id,
+                "status": status,
+                "previous": previous,
+                "error": (metadata or {}).get("error")
+            })
 
     async def handle_error(self, error: Exception) -> None:
         """错误处理"""
@@ -1,102 +1,454 @@
 from typing import Dict, Any, List, Optional
 from ..base import BaseAgent, AgentRegistry
-from ..executor.executor_agent import ExecutorAgent
+from ..executor.executor_pool import ExecutorPool
+from ..executor.tools.sandbox import code_worker_pool
 from ..supervisor.supervisor_agent import SupervisorAgent
 import asyncio
+import time
 import uuid
 from datetime import datetime
 import logging
 from src.common.config.settings import settings
+from src.common.events.event_bus import EventBus, EventTypes
+from src.core.task.task_queue import TaskQueue
+from src.core.task.task_store import TaskStore
+from src.core.task.admission import AdmissionController, AdmissionDecision
+from src.core.task.shared_queue import SharedTaskQueue, create_shared_queue
+from src.core.task.checkpoint import CheckpointStore
+from src.storage.cache.result_cache import ResultCache
+from src.models.task import TaskPriority
 
 class ControllerAgent(BaseAgent):
     """控制器代理实现"""
     
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None, resume_tasks: Optional[bool] = None):
         super().__init__(f"controller_{uuid.uuid4().hex[:8]}")
-        self.tasks: Dict[str, Dict[str, Any]] = {}
-        self.executor: Optional[ExecutorAgent] = None
+        # local: 在本进程内执行任务；distributed: 任务写入共享队列，由执行进程消费
+        self.mode = mode or settings.EXECUTION_MODE
+        self.resume_tasks = settings.CHECKPOINT_RESUME if resume_tasks is None else resume_tasks
+        self.tasks = TaskStore()
+        self.executor_pool: Optional[ExecutorPool] = None
         self.supervisor: Optional[SupervisorAgent] = None
+        self.event_bus = EventBus()
+        self.task_queue = TaskQueue(self._run_task, max_workers=settings.MAX_WORKERS)
+        self._completions: Dict[str, asyncio.Future] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self.result_cache = ResultCache()
+        self.admission = AdmissionController()
+        self.shared_queue: Optional[SharedTaskQueue] = (
+            create_shared_queue() if self.mode == "distributed" else None
+        )
+        self._collector: Optional[asyncio.Task] = None
+        # 检查点只在实际执行任务的进程中记录
+        self.checkpoints: Optional[CheckpointStore] = (
+            CheckpointStore() if settings.CHECKPOINT_ENABLED and not self.shared_queue else None
+        )
 
     async def initialize(self) -> bool:
         """初始化控制器代理"""
         try:
-            # 初始化执行代理
-            self.executor = ExecutorAgent()
-            await self.executor.initialize()
-            AgentRegistry.register(self.executor)
-            
             # 初始化监督代理
             self.supervisor = SupervisorAgent()
             await self.supervisor.initialize()
             AgentRegistry.register(self.supervisor)
             
+            # 初始化结果缓存
+            await self.result_cache.initialize()
+            
+            if self.shared_queue:
+                # 分布式模式：只负责入队和收集执行进程写回的状态
+                await self.shared_queue.initialize()
+                self._collector = asyncio.create_task(self._collect_results())
+            else:
+                # 初始化执行代理池并启动任务队列工作协程
+                self.executor_pool = ExecutorPool()
+                await self.executor_pool.initialize()
+                # 在后台预热代码执行进程
+                await code_worker_pool.start()
+                await self.task_queue.start()
+                if self.checkpoints:
+                    await asyncio.to_thread(self.checkpoints.register_owner, self.agent_id)
+                    if self.resume_tasks:
+                        await self._resume_tasks()
+            
             await self.update_state("ready")
-            self.logger.info(f"Controller {self.agent_id} initialized with executor and supervisor")
+            self.logger.info(f"Controller {self.agent_id} initialized in {self.mode} mode")
             return True
         except Exception as e:
             await self.handle_error(e)
             return False
 
     async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """处理任务"""
+        """处理任务：入队并等待执行完成"""
         try:
-            task_id = uuid.uuid4().hex
-            task["task_id"] = task_id
-            self.tasks[task_id] = {
-                "task": task,
-                "status": "pending",
-                "created_at": datetime.now(),
-                "result": None
-            }
+            task_id = await self.submit_task(task)
+            return await self.wait_for_task(task_id)
+        except Exception as e:
+            await self.handle_error(e)
+            return {"status": "error", "error": str(e)}
+
+    def check_admission(self, priority: str = TaskPriority.MEDIUM.value, count: int = 1) -> AdmissionDecision:
+        """根据当前负载判定是否接收新任务"""
+        if self.shared_queue:
+            # 未完成的任务都在共享队列或执行进程中
+            return self.admission.check(
+                len(self._completions),
+                0,
+                settings.MAX_WORKERS * settings.WORKER_PROCESSES,
+                priority,
+                count
+            )
+        return self.admission.check(
+            self.task_queue.qsize(),
+            self.task_queue.in_flight,
+            self.task_queue.max_workers,
+            priority,
+            count
+        )
+
+    async def submit_task(self, task: Dict[str, Any]) -> str:
+        """提交任务到执行队列，立即返回任务ID"""
+        task_ids = await self.submit_tasks([task])
+        return task_ids[0]
+
+    async def submit_tasks(self, tasks: List[Dict[str, Any]], checkpoint: bool = True) -> List[str]:
+        """批量提交任务：全部登记后一起入队，返回的任务ID与输入顺序一致
+
+        任务可预先携带 task_id（例如已写入数据库的批量任务），否则自动生成
+        """
+        task_ids = []
+        queued = []
+        for task in tasks:
+            if await self._register_task(task):
+                queued.append(task)
+            task_ids.append(task["task_id"])
+        
+        if self.checkpoints and checkpoint and queued:
+            try:
+                await asyncio.to_thread(self.checkpoints.record_tasks, self.agent_id, queued)
+            except Exception as e:
+                self.logger.error(f"Failed to checkpoint submitted tasks: {str(e)}")
+        
+        if self.shared_queue and queued:
+            await self.shared_queue.push(queued)
+        elif not self.shared_queue:
+            for task in queued:
+                await self.task_queue.put(task["task_id"], task.get("priority", TaskPriority.MEDIUM.value))
+        for task in queued:
+            await self.event_bus.publish(EventTypes.TASK_CREATED, {
+                "task_id": task["task_id"],
+                "type": task.get("type", "general")
+            })
+        return task_ids
+
+    async def _register_task(self, task: Dict[str, Any]) -> bool:
+        """登记任务，返回是否需要入队执行（缓存命中时直接完成）"""
+        task_id = task.get("task_id") or uuid.uuid4().hex
+        task["task_id"] = task_id
+        # 截止时间从提交时开始计算，排队时间也计入；执行进程沿用API进程设定的截止时间
+        if not task.get("deadline"):
+            task["deadline"] = time.time() + (task.get("timeout") or settings.TASK_TIMEOUT)
+        
+        # 相同任务在缓存有效期内直接返回缓存结果
+        cache_key = None
+        if self.result_cache.is_cacheable(task):
+            cache_key = self.result_cache.fingerprint(task)
+            cached_result = await self.result_cache.get(cache_key)
+            if cached_result is not None:
+                now = datetime.now()
+                self.tasks.add(task_id, {
+                    "task": task,
+                    "status": "completed",
+                    "created_at": now,
+                    "completed_at": now,
+                    "result": cached_result,
+                    "cached": True
+                })
+                await self.event_bus.publish(EventTypes.TASK_COMPLETED, {
+                    "task_id": task_id,
+                    "cached": True
+                })
+                return False
+        
+        self.tasks.add(task_id, {
+            "task": task,
+            "status": "pending",
+            "created_at": datetime.now(),
+            "result": None,
+            "cache_key": cache_key
+        })
+        self._completions[task_id] = asyncio.get_running_loop().create_future()
+        return True
+
+    async def wait_for_task(self, task_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """等待任务执行完成并返回结果"""
+        future = self._completions.get(task_id)
+        if future is not None:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        return await self._task_response(task_id)
+
+    async def cancel_task(self, task_id: str) -> bool:
+        """取消排队中或运行中的任务，已结束的任务返回 False"""
+        task_data = self.tasks.get(task_id)
+        if not task_data or task_data["status"] not in ("pending", "running"):
+            return False
+        
+        # 排队中的任务在出队时被跳过；运行中的任务通过取消协程逐层中止
+        self.tasks.update(task_id, status="cancelled", completed_at=datetime.now())
+        if self.shared_queue:
+            # 执行进程出队时跳过，运行中的由执行进程轮询到后中止
+            await self.shared_queue.set_state(task_id, {"status": "cancelled"})
+        runner = self._running.get(task_id)
+        if runner is not None:
+            runner.cancel()
+        else:
+            self._resolve(task_id)
+        await self.event_bus.publish(EventTypes.TASK_CANCELLED, {"task_id": task_id})
+        return True
+
+    async def _run_task(self, task_id: str) -> None:
+        """由队列工作协程调用，在截止时间内执行单个任务"""
+        task_data = self.tasks.get(task_id)
+        if not task_data or task_data["status"] != "pending":
+            # 已取消的任务不再执行
+            if task_data:
+                await self._finish_checkpoint(task_id, task_data["status"])
+            self._resolve(task_id)
+            return
+        task = task_data["task"]
+        runner = None
+        started = None
+        try:
+            remaining = task["deadline"] - time.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
             
+            self.tasks.update(task_id, status="running", started_at=datetime.now())
             await self.update_state("processing", {"task_id": task_id})
+            await self.event_bus.publish(EventTypes.TASK_STARTED, {"task_id": task_id})
             
-            # 1. 任务分析和规划
-            plan = await self._analyze_task(task)
-            
-            # 2. 分配任务给执行代理
-            if self.executor:
-                execution_result = await self.executor.process_task(task)
-                self.tasks[task_id]["result"] = execution_result
-                
-                # 3. 监督任务执行
-                if self.supervisor:
-                    await self.supervisor.process_task({
-                        "type": "monitor",
-                        "target": self.executor.agent_id,
-                        "task_id": task_id
-                    })
+            started = time.monotonic()
+            runner = asyncio.create_task(self._execute_task(task_id, task_data))
+            self._running[task_id] = runner
+            await asyncio.wait_for(runner, timeout=remaining)
             
             # 4. 更新任务状态
-            self.tasks[task_id]["status"] = "completed"
+            self.tasks.update(task_id, status="completed", completed_at=datetime.now())
             await self.update_state("completed", {"task_id": task_id})
-            
-            return {
+            await self.event_bus.publish(EventTypes.TASK_COMPLETED, {"task_id": task_id})
+        except asyncio.TimeoutError:
+            error = f"Task exceeded its deadline of {task.get('timeout') or settings.TASK_TIMEOUT} seconds"
+            self.tasks.update(task_id, status="timeout", error=error, completed_at=datetime.now())
+            await self.event_bus.publish(EventTypes.TASK_FAILED, {
                 "task_id": task_id,
-                "status": "completed",
-                "result": self.tasks[task_id]["result"]
-            }
+                "error": error
+            })
+        except asyncio.CancelledError:
+            if task_data["status"] != "cancelled":
+                # 工作协程本身被取消（服务关闭）
+                if runner is not None:
+                    runner.cancel()
+                raise
         except Exception as e:
-            if task_id in self.tasks:
-                self.tasks[task_id]["status"] = "error"
-                self.tasks[task_id]["error"] = str(e)
+            self.tasks.update(task_id, status="error", error=str(e), completed_at=datetime.now())
             await self.handle_error(e)
-            return {"status": "error", "error": str(e)}
+            await self.event_bus.publish(EventTypes.TASK_FAILED, {
+                "task_id": task_id,
+                "error": str(e)
+            })
+        finally:
+            if started is not None:
+                self.admission.record_duration(time.monotonic() - started)
+            self._running.pop(task_id, None)
+            if task_data["status"] in TaskStore.FINISHED_STATUSES:
+                # 服务关闭时中断的任务保留检查点，重启后继续执行
+                await self._finish_checkpoint(task_id, task_data["status"])
+            self._resolve(task_id)
+
+    async def _execute_task(self, task_id: str, task_data: Dict[str, Any]) -> None:
+        """规划并执行任务"""
+        task = task_data["task"]
+        
+        # 1. 任务分析和规划
+        plan = await self._analyze_task(task)
+        
+        # 从检查点恢复已完成步骤的输出
+        completed = None
+        if self.checkpoints:
+            completed = await asyncio.to_thread(self.checkpoints.load_steps, task_id)
+            if completed:
+                self.logger.info(f"Resuming task {task_id} after steps: {', '.join(completed)}")
+        
+        async def on_step_finished(step_id: str, output: Dict[str, Any]) -> None:
+            if self.checkpoints and output.get("status") == "completed":
+                await self._checkpoint_step(task_id, step_id, output)
+            event = {"task_id": task_id, "step_id": step_id, "status": output.get("status")}
+            if output.get("error"):
+                event["error"] = output["error"]
+            await self.event_bus.publish(EventTypes.TASK_STEP_COMPLETED, event)
+        
+        # 2. 分配任务给负载最低的执行代理
+        if self.executor_pool:
+            async with self.executor_pool.lease() as executor:
+                execution_result = await executor.execute_plan(plan, task, completed, on_step_finished)
+            self.tasks.update(task_id, result=execution_result)
+            await self._cache_result(task_data, execution_result)
+            # 监督代理通过任务和代理事件异步跟踪执行情况，不在此等待
+
+    async def _collect_results(self) -> None:
+        """分布式模式下轮询共享状态，更新本地任务存储并唤醒等待方"""
+        while True:
+            await asyncio.sleep(settings.SHARED_QUEUE_POLL_INTERVAL)
+            task_ids = list(self._completions)
+            if not task_ids:
+                continue
+            try:
+                states = await self.shared_queue.get_states(task_ids)
+            except Exception as e:
+                self.logger.error(f"Failed to read shared task states: {str(e)}")
+                continue
+            for task_id in task_ids:
+                await self._apply_state(task_id, states.get(task_id))
+
+    async def _apply_state(self, task_id: str, state: Optional[Dict[str, Any]]) -> None:
+        """应用执行进程写回的任务状态"""
+        task_data = self.tasks.get(task_id)
+        if not task_data or task_data["status"] in TaskStore.FINISHED_STATUSES:
+            self._resolve(task_id)
+            return
+        status = (state or {}).get("status")
+        
+        if status in TaskStore.FINISHED_STATUSES:
+            result = state.get("result")
+            self.tasks.update(
+                task_id,
+                status=status,
+                result=result,
+                error=state.get("error"),
+                completed_at=datetime.now()
+            )
+            if status == "completed":
+                if isinstance(result, dict):
+                    await self._cache_result(task_data, result)
+                await self.event_bus.publish(EventTypes.TASK_COMPLETED, {"task_id": task_id})
+            else:
+                await self.event_bus.publish(EventTypes.TASK_FAILED, {
+                    "task_id": task_id,
+                    "error": state.get("error")
+                })
+            self._resolve(task_id)
+        elif status == "running" and task_data["status"] == "pending":
+            self.tasks.update(task_id, status="running", started_at=datetime.now())
+            await self.event_bus.publish(EventTypes.TASK_STARTED, {
+                "task_id": task_id,
+                "worker": state.get("worker")
+            })
+        elif time.time() > task_data["task"]["deadline"] + settings.SHARED_QUEUE_POLL_INTERVAL * 10:
+            # 没有执行进程处理该任务
+            error = "Task exceeded its deadline before a worker reported a result"
+            self.tasks.update(task_id, status="timeout", error=error, completed_at=datetime.now())
+            await self.event_bus.publish(EventTypes.TASK_FAILED, {
+                "task_id": task_id,
+                "error": error
+            })
+            self._resolve(task_id)
+
+    async def _resume_tasks(self) -> None:
+        """接管已退出的控制器未结束的任务并重新提交"""
+        try:
+            tasks = await asyncio.to_thread(self.checkpoints.claim_unfinished, self.agent_id)
+        except Exception as e:
+            self.logger.error(f"Failed to load unfinished tasks: {str(e)}")
+            return
+        if not tasks:
+            return
+        
+        for task in tasks:
+            # 截止时间从恢复时重新计算
+            task.pop("deadline", None)
+        await self.submit_tasks(tasks, checkpoint=False)
+        for task in tasks:
+            # 命中结果缓存的任务不会再执行
+            task_data = await self.tasks.fetch(task["task_id"])
+            if task_data and task_data["status"] in TaskStore.FINISHED_STATUSES:
+                await self._finish_checkpoint(task["task_id"], task_data["status"])
+        self.logger.info(f"Resumed {len(tasks)} unfinished tasks from checkpoints")
+
+    async def _checkpoint_step(self, task_id: str, step_id: str, output: Dict[str, Any]) -> None:
+        """保存已完成步骤的输出，失败时只记录日志"""
+        try:
+            await asyncio.to_thread(self.checkpoints.record_step, task_id, self.agent_id, step_id, output)
+        except Exception as e:
+            self.logger.error(f"Failed to checkpoint step {step_id} of task {task_id}: {str(e)}")
+
+    async def _finish_checkpoint(self, task_id: str, status: str) -> None:
+        """记录任务结束，之后不再恢复"""
+        if not self.checkpoints:
+            return
+        try:
+            await asyncio.to_thread(self.checkpoints.finish_task, task_id, self.agent_id, status)
+        except Exception as e:
+            self.logger.error(f"Failed to finish checkpoint of task {task_id}: {str(e)}")
+
+    def _resolve(self, task_id: str) -> None:
+        """唤醒等待该任务结果的调用方"""
+        future = self._completions.pop(task_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def _cache_result(self, task_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """缓存完全成功的执行结果"""
+        cache_key = task_data.get("cache_key")
+        if not cache_key or result.get("status") != "completed" or result.get("warnings"):
+            return
+        ttl = self.result_cache.ttl_for(task_data["task"])
+        await self.result_cache.set(cache_key, result, ttl)
+
+    async def _task_response(self, task_id: str) -> Dict[str, Any]:
+        """构造任务结果响应"""
+        task_data = await self.tasks.fetch(task_id)
+        if not task_data:
+            return {"task_id": task_id, "status": "error", "error": "Task not found"}
+        response = {
+            "task_id": task_id,
+            "status": task_data["status"],
+            "result": task_data.get("result")
+        }
+        if task_data.get("error"):
+            response["error"] = task_data["error"]
+        return response
 
     async def cleanup(self) -> bool:
         """清理资源"""
         try:
-            # 清理执行代理
-            if self.executor:
-                await self.executor.cleanup()
-                AgentRegistry.unregister(self.executor.agent_id)
+            # 停止任务队列
+            await self.task_queue.stop()
+            if self._collector:
+                self._collector.cancel()
+                await asyncio.gather(self._collector, return_exceptions=True)
+                self._collector = None
+            for future in self._completions.values():
+                if not future.done():
+                    future.cancel()
+            self._completions = {}
+            await self.result_cache.cleanup()
+            if self.shared_queue:
+                await self.shared_queue.cleanup()
+            
+            # 清理执行代理池
+            if self.executor_pool:
+                await self.executor_pool.cleanup()
+                # 执行代理共享的代码执行进程
+                await code_worker_pool.shutdown()
+            if self.checkpoints:
+                self.checkpoints.release_owner()
             
             # 清理监督代理
             if self.supervisor:
                 await self.supervisor.cleanup()
                 AgentRegistry.unregister(self.supervisor.agent_id)
             
-            self.tasks = {}
+            self.tasks.clear()
             await self.update_state("shutdown")
             return True
         except Exception as e:
@@ -107,7 +459,7 @@ class ControllerAgent(BaseAgent):
         """分析任务并制定执行计划"""
         task_type = task.get("type", "general")
         content = task.get("content", "")
-        metadata = task.get("metadata", {})
+        metadata = task.get("metadata") or {}
         
         plan = {
             "task_id": task["task_id"],
@@ -115,23 +467,39 @@ class ControllerAgent(BaseAgent):
             "steps": []
         }
         
+        # 每个步骤通过 depends_on 声明依赖，互不依赖的步骤会并发执行
         if task_type == "code_analysis":
             plan["steps"] = [
-                {"action": "analyze_code", "tool": "code_runner"},
-                {"action": "generate_report", "tool": "data_analyzer"}
+                {"id": "analyze_code", "action": "analyze_code", "tool": "code_runner", "depends_on": []},
+                {"id": "generate_report", "action": "generate_report", "tool": "data_analyzer", "depends_on": []}
             ]
         elif task_type == "file_operation":
             plan["steps"] = [
-                {"action": "process_file", "tool": "file_processor"}
+                {"id": "process_file", "action": "process_file", "tool": "file_processor", "depends_on": []}
             ]
         elif task_type == "data_processing":
             plan["steps"] = [
-                {"action": "analyze_data", "tool": "data_analyzer"},
-                {"action": "process_results", "tool": "file_processor"}
+                {"id": "analyze_data", "action": "analyze_data", "tool": "data_analyzer", "depends_on": []}
+            ]
+            # 只有在 metadata 中指定 output_path（相对于数据目录）时才把分析后的数据集写入文件
+            if metadata.get("output_path"):
+                plan["steps"].append(
+                    {"id": "process_results", "action": "process_results", "tool": "file_processor",
+                     "depends_on": ["analyze_data"],
+                     "params": {
+                         "operation": "write",
+                         "format": metadata.get("output_format", "json"),
+                         "file_path": metadata["output_path"]
+                     }}
+                )
+        elif task_type == "network_request":
+            plan["steps"] = [
+                {"id": "network_request", "action": "network_request", "tool": "network_tool", "depends_on": []}
             ]
         else:
+            # 一般任务不指定工具，由执行代理根据内容选择
             plan["steps"] = [
-                {"action": "general_processing", "tool": "code_runner"}
+                {"id": "general_processing", "action": "general_processing", "tool": None, "depends_on": []}
             ]
         
         return plan
@@ -139,12 +507,11 @@ class ControllerAgent(BaseAgent):
     def get_state(self) -> Dict[str, Any]:
         """获取代理状态"""
         state = super().get_state()
-        state.metadata["tasks"] = [
-            {
-                "task_id": task_id,
-                "status": task_data["status"],
-                "created_at": task_data["created_at"].isoformat()
-            }
-            for task_id, task_data in self.tasks.items()
-        ]
+        state.metadata["mode"] = self.mode
+        state.metadata["task_counts"] = self.tasks.counts()
+        if self.executor_pool:
+            state.metadata["executor_pool"] = self.executor_pool.stats()
+        state.metadata["result_cache"] = self.result_cache.stats()
+        state.metadata["admission"] = self.admission.stats()
+        state.metadata["queue"] = self.task_queue.stats()
         return state 
\ No newline at end of file
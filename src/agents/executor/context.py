@@ -0,0 +1,84 @@
+from typing import Dict, Any, List, Callable, Optional
+import time
+import uuid
+import logging
+
+from src.core.task.data_channel import DataChannel
+
+logger = logging.getLogger(__name__)
+
+class ToolPool:
+    """有状态工具的实例池
+
+    每个任务独占一个实例，任务结束后重置状态并放回池中复用，
+    避免重复初始化，也避免并发任务互相修改同一份状态。
+    """
+
+    def __init__(self, factory: Callable[[], Any], reset: Callable[[Any], None], max_idle: int = 4):
+        self.factory = factory
+        self.reset = reset
+        self.max_idle = max_idle
+        self._idle: List[Any] = []
+        self.created = 0
+        self.in_use = 0
+
+    def acquire(self) -> Any:
+        """取出空闲实例，没有时新建"""
+        if self._idle:
+            instance = self._idle.pop()
+        else:
+            instance = self.factory()
+            self.created += 1
+        self.in_use += 1
+        return instance
+
+    def release(self, instance: Any) -> None:
+        """重置实例状态并放回池中，超出空闲上限时丢弃"""
+        self.in_use -= 1
+        try:
+            self.reset(instance)
+        except Exception as e:
+            logger.error(f"Failed to reset pooled tool instance: {str(e)}")
+            return
+        if len(self._idle) < self.max_idle:
+            self._idle.append(instance)
+
+    def clear(self) -> List[Any]:
+        """清空空闲实例并返回，供调用方清理"""
+        idle, self._idle = self._idle, []
+        return idle
+
+    def stats(self) -> Dict[str, int]:
+        """实例池状态"""
+        return {"created": self.created, "in_use": self.in_use, "idle": len(self._idle)}
+
+class ExecutionContext:
+    """单个任务的执行上下文，持有该任务独占的工具实例和步骤间的数据通道"""
+
+    def __init__(self, task: Dict[str, Any], tools: Dict[str, Dict[str, Any]]):
+        self.task = task
+        self.task_id = task.get("task_id") or uuid.uuid4().hex
+        self.started_at = time.monotonic()
+        self._tools = tools
+        self._leased: Dict[str, Any] = {}
+        self.channel = DataChannel()
+
+    def get_tool(self, tool_name: str) -> Any:
+        """获取工具实例：并发安全的工具共享，其余工具从池中为本任务租用"""
+        tool = self._tools[tool_name]
+        if tool.get("pool") is None:
+            return tool["instance"]
+        instance = self._leased.get(tool_name)
+        if instance is None:
+            instance = tool["pool"].acquire()
+            self._leased[tool_name] = instance
+        return instance
+
+    def release(self) -> None:
+        """归还本任务租用的工具实例"""
+        for tool_name, instance in self._leased.items():
+            pool = self._tools.get(tool_name, {}).get("pool")
+            if pool is not None:
+                pool.release(instance)
+        self._leased = {}
+        self.channel = DataChannel()
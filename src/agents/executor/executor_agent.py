@@ -1,24 +1,53 @@
-from typing import Dict, Any, List, Optional
-from ..base import BaseAgent
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from ..base import BaseAgent, AgentState
 import asyncio
+import codecs
+import inspect
+import time
 import uuid
 from datetime import datetime
 import logging
 from src.common.config.settings import settings
+from src.common.events.event_bus import EventBus, EventTypes
+from src.core.task.data_channel import DataChannel
+from src.core.task.plan_executor import PlanExecutor, StepCallback
+from src.core.tools.resilience import CircuitOpenError, tool_resilience
+from src.core.tools.tool_manager import ToolManager
+from src.core.tools.tool_selector import ToolSelector
+
+from .context import ExecutionContext, ToolPool
+from .result_store import ResultStore
+from .streaming import ToolChunk, stream_callback
 
 from .tools.code_runner import CodeRunner
 from .tools.file_processor import FileProcessor
 from .tools.network_tool import NetworkTool
 from .tools.data_analyzer import DataAnalyzer
 
+# 当前协程所属任务的执行上下文，随 asyncio 任务创建自动传递给并发的步骤和工具
+_execution_context: ContextVar[Optional[ExecutionContext]] = ContextVar("execution_context", default=None)
+
 class ExecutorAgent(BaseAgent):
-    """执行代理实现"""
+    """执行代理实现
+
+    每个任务在独立的执行上下文中运行，有状态的工具按任务从实例池租用，
+    同一个执行代理可以同时处理多个任务。
+    工具处理器可以直接返回结果，也可以是逐个产出 ToolChunk、最后产出结果的异步生成器，
+    分块作为 tool.output 事件发布。
+    """
     
     def __init__(self):
         super().__init__(f"executor_{uuid.uuid4().hex[:8]}")
-        self.current_task: Optional[Dict[str, Any]] = None
+        self.contexts: Dict[str, ExecutionContext] = {}
         self.tools: Dict[str, Any] = {}
-        self.results: Dict[str, Any] = {}
+        self.tool_manager = ToolManager()
+        self.selector: Optional[ToolSelector] = None
+        self.results = ResultStore(self.agent_id)
+        self.event_bus = EventBus()
+        self.resilience = tool_resilience
+        self.plan_executor = PlanExecutor(self._run_step)
 
     async def initialize(self) -> bool:
         """初始化执行代理"""
@@ -35,35 +64,182 @@ class ExecutorAgent(BaseAgent):
     async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """处理任务"""
         try:
-            self.current_task = task
-            task_id = task.get("task_id", uuid.uuid4().hex)
-            await self.update_state("processing", {"task_id": task_id})
-
-            # 1. 选择合适的工具
-            tools = await self._select_tools(task)
-            
-            # 2. 执行任务
-            result = await self._execute_task(task, tools)
-            
-            # 3. 验证结果
-            validated_result = await self._validate_result(result)
-            
-            # 4. 存储结果
-            self.results[task_id] = validated_result
-            
-            await self.update_state("completed", {"task_id": task_id})
-            return validated_result
+            async with self._task_context(task) as context:
+                task_id = context.task_id
+                await self.update_state("processing", {"task_id": task_id})
+
+                # 1. 选择合适的工具
+                tools = await self._select_tools(task)
+                
+                # 2. 执行任务
+                result = await self._execute_task(task, tools)
+                
+                # 3. 验证结果
+                validated_result = await self._validate_result(result)
+                
+                # 4. 存储结果
+                self.results.put(task_id, validated_result)
+                
+                await self.update_state("completed", {"task_id": task_id})
+                return validated_result
         except Exception as e:
             await self.handle_error(e)
             return {"status": "error", "error": str(e)}
+
+    async def execute_plan(self, plan: Dict[str, Any], task: Dict[str, Any],
+                           completed: Optional[Dict[str, Dict[str, Any]]] = None,
+                           on_step_finished: Optional[StepCallback] = None) -> Dict[str, Any]:
+        """按执行计划的依赖图并发执行各步骤，跳过检查点中已完成的步骤"""
+        steps = plan.get("steps", [])
+        if not steps or any(step.get("tool") is None for step in steps):
+            # 未指定工具的计划由执行代理根据任务内容选择工具
+            return await self.process_task(task)
+        
+        try:
+            async with self._task_context(task) as context:
+                task_id = context.task_id
+                await self.update_state("processing", {"task_id": task_id})
+                
+                # 步骤之间通过数据通道按引用传递对象，只有最终输出需要序列化
+                context.channel = DataChannel(self.plan_executor.build_graph(steps).values())
+                result = await self.plan_executor.execute(plan, task, completed, on_step_finished)
+                validated_result = await self._validate_result(result)
+                self.results.put(task_id, validated_result)
+                
+                await self.update_state("completed", {"task_id": task_id})
+                return validated_result
+        except Exception as e:
+            await self.handle_error(e)
+            return {"status": "error", "error": str(e)}
+
+    async def run_tool(self, tool_name: str, task: Dict[str, Any],
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """执行单个工具，超时和异常转为错误结果，不影响其他工具
+
+        瞬时错误在超时时间内按工具声明的策略重试，工具熔断时直接返回错误；
+        流式任务已发布的分块无法撤回，只尝试一次
+        """
+        tool = self.tools.get(tool_name)
+        if not tool:
+            return {"status": "error", "error": f"Unknown tool: {tool_name}"}
+        if _execution_context.get() is None:
+            # 在任务之外直接调用时使用临时上下文
+            async with self._task_context(task):
+                return await self.run_tool(tool_name, task, timeout)
+        deadline = time.time() + timeout if timeout is not None else task.get("deadline")
+        try:
+            return await asyncio.wait_for(
+                self.resilience.call(tool_name, lambda: self._invoke(tool, task),
+                                     retry=not task.get("stream"), deadline=deadline),
+                timeout=timeout
+            )
+        except CircuitOpenError as e:
+            self.logger.warning(str(e))
+            return {"status": "error", "error": str(e), "circuit": "open", "retry_after": e.retry_after}
+        except asyncio.TimeoutError:
+            self.logger.error(f"Tool {tool['name']} timed out after {timeout} seconds")
+            self.resilience.record_failure(tool_name, f"Timed out after {timeout} seconds")
+            return {"status": "error", "error": f"Tool {tool_name} timed out after {timeout} seconds"}
+        except Exception as e:
+            self.logger.error(f"Tool {tool['name']} execution failed: {str(e)}")
+            return {"status": "error", "error": str(e)}
+
+    async def _invoke(self, tool: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
+        """调用工具处理器；处理器产出分块时逐个发布，最后一个非分块项作为结果"""
+        output = tool["handler"](task)
+        if inspect.isawaitable(output):
+            output = await output
+        if not hasattr(output, "__aiter__"):
+            return output
+        
+        result = None
+        seq = 0
+        try:
+            async for item in output:
+                if isinstance(item, ToolChunk):
+                    await self._publish_chunk(tool["id"], task, item, seq)
+                    seq += 1
+                else:
+                    result = item
         finally:
-            self.current_task = None
+            # 超时或取消时关闭生成器，释放其持有的文件和连接
+            if hasattr(output, "aclose"):
+                await output.aclose()
+        if result is None:
+            result = {"status": "completed", "timestamp": datetime.now().isoformat()}
+        return {**result, "chunks": seq}
+
+    async def _publish_chunk(self, tool_id: str, task: Dict[str, Any], chunk: ToolChunk, seq: int) -> None:
+        """发布工具输出分块"""
+        await self.event_bus.publish(EventTypes.TOOL_OUTPUT, {
+            "task_id": task.get("task_id"),
+            "tool": tool_id,
+            "step": task.get("step"),
+            "kind": chunk.kind,
+            "seq": seq,
+            "data": chunk.data
+        })
+
+    def get_state(self) -> AgentState:
+        """获取代理状态"""
+        state = super().get_state()
+        state.metadata["active_tasks"] = len(self.contexts)
+        state.metadata["result_store"] = self.results.stats()
+        code_runner = self.tools.get("code_runner")
+        if code_runner:
+            state.metadata["code_runner"] = {
+                "workers": code_runner["instance"].pool.stats(),
+                "code_cache": code_runner["instance"].cache.stats()
+            }
+        return state
+
+    @asynccontextmanager
+    async def _task_context(self, task: Dict[str, Any]) -> AsyncIterator[ExecutionContext]:
+        """为任务创建执行上下文，结束时归还租用的工具实例"""
+        context = ExecutionContext(task, self.tools)
+        self.contexts[context.task_id] = context
+        token = _execution_context.set(context)
+        try:
+            yield context
+        finally:
+            _execution_context.reset(token)
+            self.contexts.pop(context.task_id, None)
+            context.release()
+
+    def _tool(self, tool_name: str) -> Any:
+        """获取当前任务可用的工具实例"""
+        return _execution_context.get().get_tool(tool_name)
+
+    async def _run_step(self, step: Dict[str, Any], task: Dict[str, Any],
+                        inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """执行计划步骤，步骤的 params 覆盖任务中的同名字段；
+        上游步骤的输出通过 inputs 传入，上游交接的对象通过 upstream 传入"""
+        upstream = _execution_context.get().channel.take(inputs.keys())
+        step_task = {**task, **step.get("params", {}), "step": step["id"], "action": step.get("action"),
+                     "inputs": inputs, "upstream": upstream}
+        return await self.run_tool(step["tool"], step_task, self._time_budget(task, settings.TOOL_TIMEOUT))
+
+    def _handoff(self, task: Dict[str, Any], value: Any) -> None:
+        """将步骤产出的对象交给下游步骤，不在计划中运行时忽略"""
+        if task.get("step"):
+            _execution_context.get().channel.put(task["step"], value)
+
+    @staticmethod
+    def _upstream_value(task: Dict[str, Any]) -> Any:
+        """上游交接的对象：只有一个上游时为该对象本身，多个时为按步骤ID组织的字典"""
+        upstream = task.get("upstream")
+        if not upstream:
+            return None
+        if len(upstream) == 1:
+            return next(iter(upstream.values()))
+        return upstream
 
     async def cleanup(self) -> bool:
         """清理资源"""
         try:
             # 清理工具资源
             await self._cleanup_tools()
+            self.results.clear()
             await self.update_state("shutdown")
             return True
         except Exception as e:
@@ -77,78 +253,70 @@ class ExecutorAgent(BaseAgent):
         file_processor = FileProcessor(base_dir="./data")
         network_tool = NetworkTool()
         await network_tool.initialize()
-        data_analyzer = DataAnalyzer()
         
+        # data_analyzer 持有执行状态，按任务从实例池租用；其余工具并发安全，所有任务共享
+        # （code_runner 在进程池中执行代码，每次执行使用独立的命名空间）
         self.tools = {
             "code_runner": {
+                "id": "code_runner",
                 "name": "代码执行器",
                 "description": "执行Python代码",
                 "instance": code_runner,
                 "handler": self._run_code
             },
             "file_processor": {
+                "id": "file_processor",
                 "name": "文件处理器",
                 "description": "处理文件操作",
                 "instance": file_processor,
                 "handler": self._process_file
             },
             "network_tool": {
+                "id": "network_tool",
                 "name": "网络工具",
                 "description": "处理网络请求",
                 "instance": network_tool,
                 "handler": self._handle_network
             },
             "data_analyzer": {
+                "id": "data_analyzer",
                 "name": "数据分析器",
                 "description": "分析数据",
-                "instance": data_analyzer,
+                "pool": ToolPool(DataAnalyzer, lambda analyzer: analyzer.clear_results(), settings.TOOL_POOL_MAX_IDLE),
                 "handler": self._analyze_data
             }
         }
+        
+        # 工具选择规则由 ToolManager 中的工具元数据声明
+        self.tool_manager.initialize()
+        declared = [tool for tool in self.tool_manager.list_tools() if tool["id"] in self.tools]
+        self.selector = ToolSelector(declared)
+        for tool in declared:
+            self.resilience.configure(tool["id"], tool.get("resilience"))
+        self.tool_manager.on_register(self._on_tool_registered)
+
+    def _on_tool_registered(self, tool: Dict[str, Any]) -> None:
+        """工具重新注册后更新选择规则和容错配置"""
+        if tool["id"] not in self.tools:
+            return
+        self.selector.add(tool)
+        self.resilience.configure(tool["id"], tool.get("resilience"))
 
     async def _select_tools(self, task: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """选择合适的工具"""
-        task_type = task.get("type", "general")
-        selected_tools = []
-        
-        if task_type == "code_analysis":
-            selected_tools.extend([
-                self.tools["code_runner"],
-                self.tools["data_analyzer"]
-            ])
-        elif task_type == "file_operation":
-            selected_tools.append(self.tools["file_processor"])
-        elif task_type == "data_processing":
-            selected_tools.extend([
-                self.tools["data_analyzer"],
-                self.tools["file_processor"]
-            ])
-        elif task_type == "network_request":
-            selected_tools.append(self.tools["network_tool"])
-        else:
-            # 对于一般任务，根据内容选择工具
-            content = task.get("content", "").lower()
-            if "code" in content or "python" in content:
-                selected_tools.append(self.tools["code_runner"])
-            if "file" in content or "data" in content:
-                selected_tools.append(self.tools["file_processor"])
-            if "http" in content or "api" in content:
-                selected_tools.append(self.tools["network_tool"])
-            if "analyze" in content or "statistics" in content:
-                selected_tools.append(self.tools["data_analyzer"])
-        
-        return selected_tools
+        """根据工具声明的选择规则选择合适的工具"""
+        tool_ids = self.selector.select(task.get("type", "general"), task.get("content", ""))
+        return [self.tools[tool_id] for tool_id in tool_ids]
 
     async def _execute_task(self, task: Dict[str, Any], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """执行任务"""
-        results = []
-        for tool in tools:
-            try:
-                result = await tool["handler"](task)
-                results.append(result)
-            except Exception as e:
-                self.logger.error(f"Tool {tool['name']} execution failed: {str(e)}")
-                results.append({"status": "error", "error": str(e)})
+        """并发执行选中的工具，结果顺序与工具顺序一致"""
+        limit = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+        
+        async def run(tool: Dict[str, Any]) -> Dict[str, Any]:
+            async with limit:
+                # 超时从工具实际开始执行时计算
+                return await self.run_tool(tool["id"], task, self._time_budget(task, settings.TOOL_TIMEOUT))
+        
+        results = list(await asyncio.gather(*(run(tool) for tool in tools)))
         
         return {
             "status": "completed",
@@ -180,44 +348,144 @@ class ExecutorAgent(BaseAgent):
         """清理工具资源"""
         for tool_name, tool_info in self.tools.items():
             try:
-                if hasattr(tool_info["instance"], "cleanup"):
-                    await tool_info["instance"].cleanup()
+                instances = tool_info["pool"].clear() if tool_info.get("pool") else [tool_info["instance"]]
+                for instance in instances:
+                    if hasattr(instance, "cleanup"):
+                        await instance.cleanup()
             except Exception as e:
                 self.logger.error(f"Error cleaning up tool {tool_name}: {str(e)}")
         self.tools = {}
 
+    def _time_budget(self, task: Dict[str, Any], default: float) -> float:
+        """工具可用时间：不超过任务截止时间的剩余时间"""
+        deadline = task.get("deadline")
+        if deadline is None:
+            return default
+        return max(0.0, min(default, deadline - time.time()))
+
     # 工具处理器
     async def _run_code(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """执行代码"""
         code = task.get("content", "")
-        timeout = task.get("timeout", 30)
+        timeout = self._time_budget(task, task.get("timeout") or 30)
+        
+        limits = task.get("limits")
         
-        runner = self.tools["code_runner"]["instance"]
-        return await runner.run(code, timeout)
+        runner = self._tool("code_runner")
+        if task.get("stream"):
+            return stream_callback(lambda emit: runner.run(
+                code, timeout, on_output=lambda text: emit(text, "stdout"), limits=limits
+            ))
+        return await runner.run(code, timeout, limits=limits)
 
     async def _process_file(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """处理文件"""
         operation = task.get("operation", "read")
         file_path = task.get("file_path", "")
-        content = task.get("content")
         format = task.get("format")
+        # 有上游步骤时处理上游交接的对象（如 DataFrame），没有交接对象（例如从检查点恢复）时处理上游步骤的输出；
+        # 任务中的 content 只在没有上游步骤时使用
+        content = self._upstream_value(task)
+        if content is None and task.get("inputs"):
+            content = task["inputs"]
+        if content is None:
+            content = task.get("content")
         
-        processor = self.tools["file_processor"]["instance"]
-        return await processor.process(operation, file_path, content, format)
+        processor = self._tool("file_processor")
+        if task.get("stream") and operation == "read" and \
+                (format or file_path.rsplit(".", 1)[-1]).lower() == "csv":
+            return self._stream_csv(processor, file_path)
+        result = await processor.process(operation, file_path, content, format)
+        if operation == "read" and result.get("status") == "completed":
+            self._handoff(task, result["result"])
+        return result
 
     async def _handle_network(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """处理网络请求"""
         method = task.get("method", "GET")
         url = task.get("url", "")
-        kwargs = task.get("kwargs", {})
+        kwargs = dict(task.get("kwargs", {}))
+        kwargs["timeout"] = self._time_budget(task, kwargs.get("timeout") or 30)
         
-        network_tool = self.tools["network_tool"]["instance"]
-        return await network_tool.request(method, url, **kwargs)
+        network_tool = self._tool("network_tool")
+        if task.get("stream"):
+            return self._stream_response(network_tool, method, url, kwargs)
+        return await network_tool.request(method, url, retry=task.get("retry"), **kwargs)
 
     async def _analyze_data(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """分析数据"""
-        data = task.get("data", [])
+        data = task.get("data")
+        if data is None:
+            # 上游步骤交接的数据（如读取的CSV行或 DataFrame）直接使用，不再从任务中重新解析
+            data = self._upstream_value(task)
+        if data is None:
+            data = []
         analysis_type = task.get("analysis_type", "basic")
         
-        analyzer = self.tools["data_analyzer"]["instance"]
-        return await analyzer.analyze(data, analysis_type) 
\ No newline at end of file
+        analyzer = self._tool("data_analyzer")
+        
+        async def analyze(on_column: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+            result = await analyzer.analyze(data, analysis_type, on_column=on_column)
+            if result.get("status") == "completed":
+                # 下游步骤直接使用分析用的 DataFrame
+                self._handoff(task, analyzer.data)
+            return result
+        
+        if task.get("stream"):
+            return stream_callback(lambda emit: analyze(
+                lambda column, result: emit({"column": column, **result}, "column")
+            ))
+        return await analyze()
+
+    async def _stream_csv(self, processor: FileProcessor, file_path: str) -> AsyncIterator[Any]:
+        """按页产出CSV行，最终结果只包含行数"""
+        rows = 0
+        try:
+            async for page in processor.iter_csv(file_path, settings.TOOL_STREAM_PAGE_SIZE):
+                rows += len(page)
+                yield ToolChunk(page, "rows")
+        except Exception as e:
+            self.logger.error(f"File operation error: {str(e)}")
+            yield {"status": "error", "operation": "read", "error": str(e),
+                   "timestamp": datetime.now().isoformat()}
+            return
+        yield {
+            "status": "completed",
+            "operation": "read",
+            "path": file_path,
+            "result": {"rows": rows},
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def _stream_response(self, network_tool: NetworkTool, method: str, url: str,
+                               kwargs: Dict[str, Any]) -> AsyncIterator[Any]:
+        """逐块产出响应体文本，最终结果只包含状态码、响应头和响应体字节数"""
+        response: Dict[str, Any] = {}
+        size = 0
+        decoder = None
+        try:
+            async for item in network_tool.stream(method, url, settings.TOOL_STREAM_CHUNK_SIZE, **kwargs):
+                if isinstance(item, dict):
+                    response = item
+                    decoder = codecs.getincrementaldecoder(item["charset"])(errors="replace")
+                    continue
+                size += len(item)
+                text = decoder.decode(item)
+                if text:
+                    yield ToolChunk(text, "body")
+            tail = decoder.decode(b"", final=True) if decoder else ""
+            if tail:
+                yield ToolChunk(tail, "body")
+        except Exception as e:
+            self.logger.error(f"Network request error: {str(e)}")
+            yield {"status": "error", "error": f"Request failed: {str(e)}",
+                   "retryable": NetworkTool.is_transient(e),
+                   "timestamp": datetime.now().isoformat()}
+            return
+        yield {
+            "status": "completed",
+            "status_code": response.get("status_code"),
+            "headers": response.get("headers", {}),
+            "size": size,
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,139 @@
+from typing import Dict, Any, List, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+
+from ..base import AgentRegistry
+from .executor_agent import ExecutorAgent
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ExecutorPool:
+    """执行代理池
+
+    按在途任务数选择负载最低的执行代理；所有代理负载达到阈值时扩容，
+    空闲超过 idle_timeout 秒的多余代理会被回收，池大小保持在 [min_size, max_size]。
+    """
+
+    def __init__(self, min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 scale_up_load: Optional[int] = None, idle_timeout: Optional[int] = None):
+        self.min_size = min_size or settings.EXECUTOR_POOL_MIN
+        self.max_size = max(max_size or settings.EXECUTOR_POOL_MAX, self.min_size)
+        self.scale_up_load = scale_up_load or settings.EXECUTOR_POOL_SCALE_UP_LOAD
+        self.idle_timeout = idle_timeout or settings.EXECUTOR_POOL_IDLE_TIMEOUT
+        self.executors: Dict[str, ExecutorAgent] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.last_active: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    async def initialize(self) -> None:
+        """创建最小数量的执行代理并启动回收循环"""
+        for _ in range(self.min_size):
+            await self._spawn()
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        logger.info(f"Executor pool initialized with {len(self.executors)} executors")
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[ExecutorAgent]:
+        """租用负载最低的执行代理，退出时归还"""
+        executor = await self.acquire()
+        try:
+            yield executor
+        finally:
+            self.release(executor)
+
+    async def acquire(self) -> ExecutorAgent:
+        """选择在途任务最少的执行代理，必要时扩容"""
+        async with self._lock:
+            executor = self._least_loaded()
+            if executor is None or (
+                self.in_flight[executor.agent_id] >= self.scale_up_load
+                and len(self.executors) < self.max_size
+            ):
+                executor = await self._spawn() or executor
+            if executor is None:
+                raise RuntimeError("No executor available")
+            self.in_flight[executor.agent_id] += 1
+            self.last_active[executor.agent_id] = time.monotonic()
+            return executor
+
+    def release(self, executor: ExecutorAgent) -> None:
+        """归还执行代理"""
+        if executor.agent_id in self.in_flight:
+            self.in_flight[executor.agent_id] -= 1
+            self.last_active[executor.agent_id] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """执行代理池状态"""
+        return {
+            "size": len(self.executors),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_flight": dict(self.in_flight)
+        }
+
+    def agent_ids(self) -> List[str]:
+        """池中执行代理ID列表"""
+        return list(self.executors.keys())
+
+    async def cleanup(self) -> None:
+        """停止回收循环并清理所有执行代理"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        for agent_id in list(self.executors.keys()):
+            await self._retire(agent_id)
+
+    def _least_loaded(self) -> Optional[ExecutorAgent]:
+        """在途任务最少的执行代理"""
+        if not self.executors:
+            return None
+        agent_id = min(self.executors, key=lambda a: self.in_flight[a])
+        return self.executors[agent_id]
+
+    async def _spawn(self) -> Optional[ExecutorAgent]:
+        """创建并注册新的执行代理"""
+        executor = ExecutorAgent()
+        if not await executor.initialize():
+            logger.error(f"Failed to initialize executor {executor.agent_id}")
+            return None
+        AgentRegistry.register(executor)
+        self.executors[executor.agent_id] = executor
+        self.in_flight[executor.agent_id] = 0
+        self.last_active[executor.agent_id] = time.monotonic()
+        logger.info(f"Executor {executor.agent_id} added to pool (size={len(self.executors)})")
+        return executor
+
+    async def _retire(self, agent_id: str) -> None:
+        """清理并注销执行代理"""
+        executor = self.executors.pop(agent_id, None)
+        self.in_flight.pop(agent_id, None)
+        self.last_active.pop(agent_id, None)
+        if executor:
+            await executor.cleanup()
+            AgentRegistry.unregister(agent_id)
+            logger.info(f"Executor {agent_id} removed from pool (size={len(self.executors)})")
+
+    async def _maintenance_loop(self) -> None:
+        """定期回收空闲的多余执行代理"""
+        while True:
+            await asyncio.sleep(self.idle_timeout)
+            try:
+                await self._scale_down()
+            except Exception as e:
+                logger.error(f"Error in executor pool maintenance: {str(e)}")
+
+    async def _scale_down(self) -> None:
+        """回收空闲超时的执行代理，保留最小数量"""
+        async with self._lock:
+            deadline = time.monotonic() - self.idle_timeout
+            idle = [
+                agent_id for agent_id in self.executors
+                if self.in_flight[agent_id] == 0 and self.last_active[agent_id] < deadline
+            ]
+            for agent_id in idle[:max(len(self.executors) - self.min_size, 0)]:
+                await self._retire(agent_id)
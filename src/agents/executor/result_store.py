@@ -0,0 +1,205 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import sys
+import uuid
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 估算大小时每个容器最多检查的元素数和嵌套深度，超出部分按已检查元素的平均大小推算
+_ESTIMATE_SAMPLE = 100
+_ESTIMATE_DEPTH = 4
+
+def estimate_size(value: Any, depth: int = 0) -> int:
+    """估算结果占用的字节数，不序列化
+
+    字符串和字节串按长度计算，字典和列表递归估算（大容器抽样），其他对象使用 sys.getsizeof。
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    else:
+        return sys.getsizeof(value)
+    size = sys.getsizeof(value)
+    if depth >= _ESTIMATE_DEPTH or not value:
+        return size
+    sampled = 0
+    total = 0
+    for item in items:
+        if sampled == _ESTIMATE_SAMPLE:
+            break
+        if isinstance(value, dict):
+            total += estimate_size(item[0], depth + 1) + estimate_size(item[1], depth + 1)
+        else:
+            total += estimate_size(item, depth + 1)
+        sampled += 1
+    return size + total * len(value) // sampled
+
+class ResultStore:
+    """按字节数限制内存占用的结果存储
+
+    结果按估算的内存占用（见 estimate_size）计入内存用量，超出 max_bytes 时按LRU淘汰。
+    启用落盘（spill_threshold > 0）时，不小于阈值的结果直接写入磁盘，
+    被淘汰的结果也转存到磁盘，内存中只保留元数据；磁盘用量超出 max_disk_bytes 时删除最旧的文件。
+    结果只在落盘时序列化一次，序列化和写入在线程池中执行，写入期间仍可读取。
+    """
+
+    def __init__(self, name: str, max_bytes: Optional[int] = None, spill_threshold: Optional[int] = None,
+                 spill_dir: Optional[str] = None, max_disk_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or settings.RESULT_STORE_MAX_BYTES
+        self.spill_threshold = settings.RESULT_STORE_SPILL_THRESHOLD if spill_threshold is None else spill_threshold
+        self.spill_dir = Path(spill_dir or settings.RESULT_STORE_SPILL_DIR) / name
+        self.max_disk_bytes = max_disk_bytes or settings.RESULT_STORE_MAX_DISK_BYTES
+        self._memory: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._disk: "OrderedDict[str, Tuple[int, Path]]" = OrderedDict()
+        # 正在写入磁盘的结果
+        self._spilling: Dict[str, Any] = {}
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.evicted = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or key in self._disk or key in self._spilling
+
+    def __len__(self) -> int:
+        return len(self._memory) + len(self._disk) + len(self._spilling)
+
+    def put(self, key: str, value: Any) -> None:
+        """保存结果"""
+        self.remove(key)
+        size = estimate_size(value)
+        if self.spill_threshold and size >= self.spill_threshold:
+            self._spill_later(key, value)
+        else:
+            self._memory[key] = (size, value)
+            self.memory_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取结果，不存在或已被淘汰时返回 None"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry[1]
+        if key in self._spilling:
+            return self._spilling[key]
+
+        disk_entry = self._disk.get(key)
+        if disk_entry is None:
+            return None
+        self._disk.move_to_end(key)
+        try:
+            with open(disk_entry[1], "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load spilled result {key}: {str(e)}")
+            self.remove(key)
+            return None
+
+    def remove(self, key: str) -> None:
+        """删除结果"""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry[0]
+        self._spilling.pop(key, None)
+        disk_entry = self._disk.pop(key, None)
+        if disk_entry is not None:
+            self.disk_bytes -= disk_entry[0]
+            self._unlink(disk_entry[1])
+
+    def clear(self) -> None:
+        """清空结果并删除落盘文件"""
+        self._memory.clear()
+        self._spilling.clear()
+        self._disk.clear()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """存储状态"""
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "spilling_entries": len(self._spilling),
+            "disk_bytes": self.disk_bytes,
+            "evicted": self.evicted
+        }
+
+    def _evict(self) -> None:
+        """按LRU淘汰超出内存和磁盘上限的结果"""
+        while self.memory_bytes > self.max_bytes and self._memory:
+            key, (size, value) = self._memory.popitem(last=False)
+            self.memory_bytes -= size
+            if self.spill_threshold:
+                self._spill_later(key, value)
+            else:
+                self.evicted += 1
+
+        while self.disk_bytes > self.max_disk_bytes and self._disk:
+            key, (size, path) = self._disk.popitem(last=False)
+            self.disk_bytes -= size
+            self._unlink(path)
+            self.evicted += 1
+
+    def _spill_later(self, key: str, value: Any) -> None:
+        """在线程池中序列化并写入磁盘，没有运行中的事件循环时直接写入"""
+        # 每次写入使用新文件，避免与同一结果之前未完成的写入冲突
+        path = self.spill_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}-{uuid.uuid4().hex[:8]}.pkl"
+        self._spilling[key] = value
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._spilled(key, value, path, self._spill(key, value, path))
+            return
+        future = loop.run_in_executor(None, self._spill, key, value, path)
+        future.add_done_callback(
+            lambda done: self._spilled(key, value, path, None if done.cancelled() else done.result())
+        )
+
+    def _spilled(self, key: str, value: Any, path: Path, size: Optional[int]) -> None:
+        """写入完成后登记磁盘结果，写入期间结果已被删除或替换时删除文件"""
+        if self._spilling.get(key) is not value:
+            if size is not None:
+                self._unlink(path)
+            return
+        del self._spilling[key]
+        if size is None:
+            self.evicted += 1
+            return
+        self._disk[key] = (size, path)
+        self.disk_bytes += size
+        self._evict()
+
+    def _spill(self, key: str, value: Any, path: Path) -> Optional[int]:
+        """序列化结果并写入磁盘，返回写入的字节数，失败时返回 None"""
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            return len(data)
+        except Exception as e:
+            logger.error(f"Failed to spill result {key}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove spilled result {path}: {str(e)}")
@@ -0,0 +1,78 @@
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Deque, Optional, Union
+from collections import deque
+import asyncio
+import logging
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ToolChunk:
+    """工具执行过程中产出的部分结果
+
+    工具处理器可以是异步生成器：先逐个产出 ToolChunk，最后产出结果字典。
+    kind 标识分块类型，例如 stdout、rows、body、column。
+    """
+
+    __slots__ = ("data", "kind")
+
+    def __init__(self, data: Any, kind: str = "data"):
+        self.data = data
+        self.kind = kind
+
+# 回调式工具调用：接收 emit(data, kind) 回调，返回最终结果
+Emit = Callable[..., None]
+CallbackRun = Callable[[Emit], Awaitable[Dict[str, Any]]]
+
+async def stream_callback(run: CallbackRun, max_pending: Optional[int] = None) -> AsyncIterator[Union[ToolChunk, Dict[str, Any]]]:
+    """将回调式的工具调用转换为异步生成器
+
+    emit 可以在事件循环线程或工作线程中调用，分块按调用顺序产出，
+    工具返回后产出其结果；生成器提前关闭时取消工具调用。
+    消费者过慢时最多缓存 max_pending 个分块，超出时丢弃最旧的分块，
+    并在下一个分块之前产出 kind 为 truncated 的分块，记录丢弃的数量。
+    """
+    loop = asyncio.get_running_loop()
+    max_pending = max_pending or settings.TOOL_STREAM_MAX_PENDING
+    pending: Deque[ToolChunk] = deque()
+    dropped = 0
+    ready = asyncio.Event()
+
+    def push(chunk: ToolChunk) -> None:
+        nonlocal dropped
+        pending.append(chunk)
+        if len(pending) > max_pending:
+            pending.popleft()
+            dropped += 1
+        ready.set()
+
+    def emit(data: Any, kind: str = "data") -> None:
+        loop.call_soon_threadsafe(push, ToolChunk(data, kind))
+
+    def take() -> ToolChunk:
+        nonlocal dropped
+        if dropped:
+            marker, dropped = ToolChunk({"dropped": dropped}, "truncated"), 0
+            return marker
+        return pending.popleft()
+
+    runner = asyncio.ensure_future(run(emit))
+    waiter = None
+    try:
+        while not runner.done():
+            while pending:
+                yield take()
+            ready.clear()
+            waiter = asyncio.ensure_future(ready.wait())
+            await asyncio.wait({waiter, runner}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+        # 让工作线程在结束前排入的分块进入缓存
+        await asyncio.sleep(0)
+        while pending:
+            yield take()
+        yield runner.result()
+    finally:
+        if waiter is not None and not waiter.done():
+            waiter.cancel()
+        if not runner.done():
+            runner.cancel()
@@ -0,0 +1,62 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import ast
+import hashlib
+import logging
+import marshal
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CodeCache:
+    """编译结果缓存
+
+    按源码的 SHA-256 缓存编译后的代码对象（marshal 序列化后的字节，直接发送给工作进程），
+    只在未命中时做语法检查和编译，超出 max_entries 时按LRU淘汰。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.CODE_CACHE_SIZE
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, code: str) -> bytes:
+        """返回编译后的代码，语法错误时抛出 SyntaxError（不缓存）"""
+        key = hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest()
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        compiled = marshal.dumps(self._compile(code))
+        self._entries[key] = compiled
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    @staticmethod
+    def _compile(code: str) -> Any:
+        """检查并编译源码，只解析一次"""
+        tree = ast.parse(code, "<code>", "exec")
+        return compile(tree, "<code>", "exec")
+
+# 进程内共享的编译结果缓存
+code_cache = CodeCache()
@@ -1,97 +1,68 @@
-import ast
-import sys
-from typing import Dict, Any, Optional
-import asyncio
-from io import StringIO
+from typing import Dict, Any, Callable, Optional
 import traceback
 import logging
 from datetime import datetime
 
+from src.common.config.settings import settings
+
+from .code_cache import CodeCache, code_cache
+from .sandbox import CodeWorkerPool, code_worker_pool
+
 logger = logging.getLogger(__name__)
 
 class CodeRunner:
-    """代码执行工具"""
+    """代码执行工具
+
+    代码在 CodeWorkerPool 的工作进程中执行，每次执行使用新的命名空间，
+    CPU密集的代码不会阻塞事件循环，超时或任务取消时结束执行该代码的工作进程。
+    源码在本进程编译一次并缓存，工作进程直接执行编译后的代码。
+    """
     
-    def __init__(self):
-        self.output_buffer = StringIO()
-        self.error_buffer = StringIO()
-        self.locals = {}
-        self.globals = {
-            '__builtins__': __builtins__,
-            'print': self._custom_print
-        }
+    def __init__(self, pool: Optional[CodeWorkerPool] = None, cache: Optional[CodeCache] = None):
+        self.pool = pool or code_worker_pool
+        self.cache = cache or code_cache
 
-    async def run(self, code: str, timeout: int = 30) -> Dict[str, Any]:
-        """执行代码"""
+    async def run(self, code: str, timeout: int = 30,
+                  on_output: Optional[Callable[[str], None]] = None,
+                  limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """执行代码
+
+        指定 on_output 时标准输出按行传给该回调（在事件循环中调用）；
+        输出过多时结果只保留最新部分，完整输出文件见 output_info；
+        limits 可以收紧本次执行的资源限制（memory_mb / cpu_seconds / max_files）。
+        结果的 usage 为实际的墙钟时间、CPU时间和常驻内存峰值。
+        """
         try:
-            # 重置缓冲区
-            self.output_buffer = StringIO()
-            self.error_buffer = StringIO()
-            
-            # 解析代码
-            tree = ast.parse(code)
-            
-            # 创建执行任务
-            task = asyncio.create_task(self._execute_code(code))
-            
-            # 等待执行完成或超时
-            try:
-                await asyncio.wait_for(task, timeout=timeout)
-                status = "completed"
-                error = None
-            except asyncio.TimeoutError:
-                status = "timeout"
-                error = f"Code execution timed out after {timeout} seconds"
-            
-            return {
-                "status": status,
-                "output": self.output_buffer.getvalue(),
-                "error": error or self.error_buffer.getvalue(),
-                "timestamp": datetime.now().isoformat()
-            }
-        except SyntaxError as e:
+            # 在本进程检查语法并编译，语法错误不占用工作进程
+            compiled = self.cache.get(code)
+        except (SyntaxError, ValueError) as e:
             return {
                 "status": "error",
                 "output": "",
                 "error": f"Syntax error: {str(e)}",
                 "timestamp": datetime.now().isoformat()
             }
+        
+        try:
+            return await self.pool.run(compiled, timeout, on_output, self.resource_limits(limits))
         except Exception as e:
+            logger.error(f"Code execution failed: {str(e)}")
             return {
                 "status": "error",
                 "output": "",
                 "error": f"Execution error: {str(e)}\n{traceback.format_exc()}",
                 "timestamp": datetime.now().isoformat()
             }
-        finally:
-            self.output_buffer.close()
-            self.error_buffer.close()
 
-    async def _execute_code(self, code: str) -> None:
-        """执行代码的具体实现"""
-        try:
-            # 执行代码
-            exec(code, self.globals, self.locals)
-        except Exception as e:
-            self.error_buffer.write(f"Execution error: {str(e)}\n")
-            self.error_buffer.write(traceback.format_exc())
-            raise
-
-    def _custom_print(self, *args, **kwargs):
-        """自定义print函数，输出重定向到缓冲区"""
-        print(*args, file=self.output_buffer, **kwargs)
-
-    def get_context(self) -> Dict[str, Any]:
-        """获取执行上下文"""
-        return {
-            "locals": self.locals,
-            "globals": {k: v for k, v in self.globals.items() if k != '__builtins__'}
+    @staticmethod
+    def resource_limits(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """本次执行的资源限制：默认取自配置，请求只能设置更严格的值"""
+        limits = {
+            "memory_mb": settings.MAX_MEMORY,
+            "cpu_seconds": settings.CODE_CPU_TIME_LIMIT,
+            "max_files": settings.CODE_MAX_OPEN_FILES
         }
-
-    def reset_context(self) -> None:
-        """重置执行上下文"""
-        self.locals = {}
-        self.globals = {
-            '__builtins__': __builtins__,
-            'print': self._custom_print
-        }
\ No newline at end of file
+        for key, value in (overrides or {}).items():
+            if key in limits and value:
+                limits[key] = min(limits[key], value) if limits[key] else value
+        return limits
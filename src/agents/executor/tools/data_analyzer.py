@@ -1,6 +1,7 @@
+import asyncio
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Callable, List, Optional, Union
 from datetime import datetime
 import logging
 import json
@@ -16,17 +17,21 @@ class DataAnalyzer:
     def __init__(self):
         self.data: Optional[pd.DataFrame] = None
         self.analysis_results: Dict[str, Any] = {}
+        self._on_column: Optional[Callable[[str, Dict[str, Any]], None]] = None
         plt.style.use('seaborn')
 
     async def analyze(self, data: Union[List[Dict[str, Any]], pd.DataFrame], 
-                     analysis_type: str = "basic") -> Dict[str, Any]:
-        """分析数据"""
+                     analysis_type: str = "basic",
+                     on_column: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """分析数据，指定 on_column 时每完成一列的分析就传给该回调"""
+        self._on_column = on_column
         try:
             # 准备数据
-            if isinstance(data, list):
-                self.data = pd.DataFrame(data)
-            else:
+            if isinstance(data, pd.DataFrame):
+                # 上游步骤交接的 DataFrame 直接使用
                 self.data = data
+            else:
+                self.data = pd.DataFrame(data)
             
             if self.data.empty:
                 raise ValueError("Empty dataset")
@@ -59,6 +64,8 @@ class DataAnalyzer:
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+        finally:
+            self._on_column = None
 
     async def _basic_analysis(self) -> Dict[str, Any]:
         """基础分析"""
@@ -72,7 +79,10 @@ class DataAnalyzer:
         
         # 生成数据分布图
         for col in self.data.select_dtypes(include=[np.number]).columns:
+            # 让出事件循环，任务取消可在列之间生效
+            await asyncio.sleep(0)
             result[f"{col}_distribution"] = await self._generate_distribution_plot(col)
+            self._emit_column(col, {"distribution": result[f"{col}_distribution"]})
         
         return result
 
@@ -87,7 +97,14 @@ class DataAnalyzer:
         
         # 添加箱线图
         for col in numeric_data.columns:
+            await asyncio.sleep(0)
             result[f"{col}_boxplot"] = await self._generate_boxplot(col)
+            self._emit_column(col, {
+                "descriptive_stats": result["descriptive_stats"].get(col),
+                "skewness": result["skewness"].get(col),
+                "kurtosis": result["kurtosis"].get(col),
+                "boxplot": result[f"{col}_boxplot"]
+            })
         
         return result
 
@@ -135,6 +152,7 @@ class DataAnalyzer:
         # 对数值列进行时间序列分析
         numeric_cols = self.data.select_dtypes(include=[np.number]).columns
         for col in numeric_cols:
+            await asyncio.sleep(0)
             # 生成时间序列图
             plt.figure(figsize=(12, 6))
             plt.plot(self.data[date_col], self.data[col])
@@ -150,9 +168,18 @@ class DataAnalyzer:
             
             # 计算移动平均
             result[f"{col}_moving_avg"] = self.data[col].rolling(window=7).mean().tolist()
+            self._emit_column(col, {
+                "trend": result[f"{col}_trend"],
+                "moving_avg": result[f"{col}_moving_avg"]
+            })
         
         return result
 
+    def _emit_column(self, column: str, result: Dict[str, Any]) -> None:
+        """将单列的分析结果传给回调"""
+        if self._on_column is not None:
+            self._on_column(str(column), result)
+
     def _get_summary_stats(self) -> Dict[str, Any]:
         """获取汇总统计"""
         summary = {}
@@ -3,7 +3,7 @@ import shutil
 import json
 import yaml
 import csv
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -58,6 +58,19 @@ class FileProcessor:
                 "timestamp": datetime.now().isoformat()
             }
 
+    async def iter_csv(self, file_path: str, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按页读取CSV文件，每页最多 page_size 行，不在内存中累积全部行"""
+        full_path = self._safe_path(file_path)
+        with full_path.open("r", encoding="utf-8", newline="") as f:
+            page = []
+            for row in csv.DictReader(f):
+                page.append(row)
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+            if page:
+                yield page
+
     def _safe_path(self, file_path: str) -> Path:
         """确保文件路径安全"""
         path = self.base_dir / file_path
@@ -138,7 +151,7 @@ class FileProcessor:
                 return json.load(f)
         else:
             with path.open("w", encoding="utf-8") as f:
-                json.dump(content, f, ensure_ascii=False, indent=2)
+                json.dump(self._to_records(content), f, ensure_ascii=False, indent=2, default=str)
 
     async def _process_yaml(self, path: Path, operation: str, 
                           content: Any = None) -> Any:
@@ -148,7 +161,7 @@ class FileProcessor:
                 return yaml.safe_load(f)
         else:
             with path.open("w", encoding="utf-8") as f:
-                yaml.safe_dump(content, f, allow_unicode=True)
+                yaml.safe_dump(self._to_records(content), f, allow_unicode=True)
 
     async def _process_csv(self, path: Path, operation: str, 
                          content: Any = None) -> Any:
@@ -158,6 +171,10 @@ class FileProcessor:
                 reader = csv.DictReader(f)
                 return [row for row in reader]
         else:
+            if self._is_dataframe(content):
+                # DataFrame 直接写出，不先转换为字典列表
+                content.to_csv(path, index=False, encoding="utf-8")
+                return
             if not content or not isinstance(content, list):
                 raise ValueError("CSV content must be a list of dictionaries")
             
@@ -167,6 +184,16 @@ class FileProcessor:
                 writer.writeheader()
                 writer.writerows(content)
 
+    @staticmethod
+    def _is_dataframe(content: Any) -> bool:
+        return hasattr(content, "to_csv") and hasattr(content, "columns")
+
+    def _to_records(self, content: Any) -> Any:
+        """DataFrame 转换为字典列表，其余内容原样返回"""
+        if self._is_dataframe(content):
+            return content.to_dict(orient="records")
+        return content
+
     async def _process_text(self, path: Path, operation: str, 
                           content: Any = None) -> Any:
         """处理文本文件"""
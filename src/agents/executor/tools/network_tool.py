@@ -1,5 +1,5 @@
 import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Optional, Union
 from datetime import datetime
 import logging
 import json
@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 class NetworkTool:
     """网络工具"""
     
+    # 重复发送不会产生额外副作用的方法，连接错误时默认可以重试
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
         self.default_headers = {
@@ -28,8 +31,11 @@ class NetworkTool:
             await self.session.close()
             self.session = None
 
-    async def request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
-        """发送请求"""
+    async def request(self, method: str, url: str, retry: Optional[bool] = None, **kwargs) -> Dict[str, Any]:
+        """发送请求
+
+        retry 指定连接错误时是否允许重试，未指定时只有幂等方法允许重试
+        """
         try:
             await self.initialize()
             
@@ -58,9 +64,13 @@ class NetworkTool:
                 }
         except aiohttp.ClientError as e:
             logger.error(f"Network request error: {str(e)}")
+            # 连接类错误是瞬时错误，但非幂等请求可能已被服务端处理，默认不重试
+            if retry is None:
+                retry = method.upper() in self.IDEMPOTENT_METHODS
             return {
                 "status": "error",
                 "error": f"Request failed: {str(e)}",
+                "retryable": retry,
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
@@ -71,6 +81,30 @@ class NetworkTool:
                 "timestamp": datetime.now().isoformat()
             }
 
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        """是否为可以重试的瞬时错误"""
+        return isinstance(error, (aiohttp.ClientError, ConnectionError))
+
+    async def stream(self, method: str, url: str, chunk_size: int = 65536,
+                     **kwargs) -> AsyncIterator[Union[Dict[str, Any], bytes]]:
+        """发送请求并流式读取响应：先产出状态码和响应头，之后逐块产出响应体"""
+        await self.initialize()
+        
+        parsed_url = urlparse(url)
+        if not parsed_url.scheme or not parsed_url.netloc:
+            raise ValueError("Invalid URL")
+        
+        request_kwargs = self._prepare_request_kwargs(kwargs)
+        async with self.session.request(method.upper(), url, **request_kwargs) as response:
+            yield {
+                "status_code": response.status,
+                "headers": dict(response.headers),
+                "charset": response.charset or "utf-8"
+            }
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
     def _prepare_request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """准备请求参数"""
         prepared = {}
@@ -0,0 +1,132 @@
+from typing import Dict, Any, IO, Iterable, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 输出文件在单个线程中按提交顺序写入，不阻塞事件循环
+_spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="code-output")
+
+class _SpillFile:
+    """完整输出文件，只在写入线程中访问"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: Optional[IO[str]] = None
+        self.failed = False
+
+    def open(self, chunks: Iterable[str]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("w", encoding="utf-8", errors="replace")
+            self._file.writelines(chunks)
+        except Exception as e:
+            logger.error(f"Failed to spill code output: {str(e)}")
+            self.failed = True
+            self.close()
+
+    def write(self, text: str) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.write(text)
+        except Exception as e:
+            logger.error(f"Failed to write code output: {str(e)}")
+            self.failed = True
+            self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class OutputBuffer:
+    """代码输出缓冲
+
+    输出总量不超过 spill_size 时全部保留在内存中；超过后完整输出写入 spill_dir 下的文件，
+    内存中只保留最新的 tail_size 个字符。spill_size 为 0 时不写文件，只保留最新部分。
+    文件在写入线程中写入，aclose() 等待写入完成。
+    """
+
+    def __init__(self, tail_size: Optional[int] = None, spill_size: Optional[int] = None,
+                 spill_dir: Optional[str] = None):
+        self.tail_size = tail_size or settings.CODE_OUTPUT_TAIL_SIZE
+        self.spill_size = settings.CODE_OUTPUT_SPILL_SIZE if spill_size is None else spill_size
+        self.spill_dir = Path(spill_dir or settings.CODE_OUTPUT_DIR)
+        self._chunks: "deque[str]" = deque()
+        self._buffered = 0
+        self.size = 0
+        self.truncated = False
+        self._spill_file: Optional[_SpillFile] = None
+
+    def write(self, text: str) -> None:
+        """追加输出"""
+        self.size += len(text)
+        self._chunks.append(text)
+        self._buffered += len(text)
+        if self._spill_file is not None:
+            _spill_executor.submit(self._spill_file.write, text)
+        elif self.size > max(self.spill_size, self.tail_size):
+            if self.spill_size:
+                self._spill()
+            self.truncated = True
+        if self.truncated:
+            self._trim()
+
+    def getvalue(self) -> str:
+        """内存中保留的输出（截断时为最新部分）"""
+        return "".join(self._chunks)
+
+    async def aclose(self) -> None:
+        """关闭落盘文件，等待之前提交的写入完成"""
+        if self._spill_file is not None:
+            await asyncio.wrap_future(_spill_executor.submit(self._spill_file.close))
+
+    def info(self) -> Dict[str, Any]:
+        """输出总量以及是否截断、完整输出文件（写入失败时没有文件）"""
+        info: Dict[str, Any] = {"size": self.size, "truncated": self.truncated}
+        if self._spill_file is not None and not self._spill_file.failed:
+            info["file"] = str(self._spill_file.path)
+        return info
+
+    def _spill(self) -> None:
+        """在写入线程中把已有输出写入文件，之后的输出追加到文件"""
+        self._spill_file = _SpillFile(self.spill_dir / f"{uuid.uuid4().hex}.log")
+        _spill_executor.submit(self._spill_file.open, list(self._chunks))
+
+    def _trim(self) -> None:
+        """只保留最新的 tail_size 个字符"""
+        while self._buffered > self.tail_size and len(self._chunks) > 1:
+            self._buffered -= len(self._chunks.popleft())
+        if self._buffered > self.tail_size:
+            chunk = self._chunks.pop()[-self.tail_size:]
+            self._chunks.append(chunk)
+            self._buffered = len(chunk)
+
+def prune_output_files(spill_dir: Optional[str] = None, retention: Optional[float] = None) -> int:
+    """删除超过保留时间的输出文件，返回删除的文件数"""
+    directory = Path(spill_dir or settings.CODE_OUTPUT_DIR)
+    retention = settings.CODE_OUTPUT_RETENTION if retention is None else retention
+    if not directory.is_dir():
+        return 0
+    expired_before = time.time() - retention
+    removed = 0
+    paths: List[Path] = list(directory.glob("*.log"))
+    for path in paths:
+        try:
+            if path.stat().st_mtime < expired_before:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove code output {path}: {str(e)}")
+    return removed
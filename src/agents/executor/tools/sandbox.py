@@ -0,0 +1,615 @@
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+import asyncio
+import builtins
+import importlib
+import io
+import logging
+import marshal
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+import types
+
+try:
+    import resource
+except ImportError:
+    # 不支持 rlimit 的平台（Windows）不限制资源
+    resource = None
+
+from src.common.config.settings import settings
+from .output_buffer import OutputBuffer, prune_output_files
+
+logger = logging.getLogger(__name__)
+
+# 工作进程中 stdout/stderr 每条管道消息的最大长度（字符），累积到该长度时立即发送
+_PIPE_FLUSH_SIZE = 8192
+# 不足 _PIPE_FLUSH_SIZE 的输出最多缓存的时间（秒）
+_PIPE_FLUSH_INTERVAL = 0.05
+# 父进程每次管道读回调最多处理的消息数，其余消息在事件循环的下一轮处理
+_PIPE_MAX_READ_MESSAGES = 64
+
+# 发送期间屏蔽的信号：信号处理函数抛出的异常会使消息只写出一部分
+_SEND_BLOCKED_SIGNALS = {signal.SIGXCPU} if hasattr(signal, "SIGXCPU") else set()
+
+class _Channel:
+    """工作进程中的管道发送端，主线程和刷新线程共用，保证消息完整"""
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, message: Any) -> None:
+        with self.lock:
+            if _SEND_BLOCKED_SIGNALS and threading.current_thread() is threading.main_thread():
+                previous = signal.pthread_sigmask(signal.SIG_BLOCK, _SEND_BLOCKED_SIGNALS)
+                try:
+                    self.conn.send(message)
+                finally:
+                    signal.pthread_sigmask(signal.SIG_SETMASK, previous)
+            else:
+                self.conn.send(message)
+
+class _PipeWriter(io.TextIOBase):
+    """工作进程中替换 sys.stdout/sys.stderr，把输出合并为不超过 _PIPE_FLUSH_SIZE 的块通过管道发送给父进程
+
+    输出累积到 _PIPE_FLUSH_SIZE 时立即发送整块，余下部分由刷新线程每 _PIPE_FLUSH_INTERVAL 秒发送一次；
+    父进程读取过慢时发送阻塞，用户代码随之暂停。
+    """
+
+    def __init__(self, channel: _Channel, stream: str):
+        self.channel = channel
+        self.stream = stream
+        self._buffer: List[str] = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        with self._lock:
+            self._buffer.append(text)
+            self._size += len(text)
+            if self._size >= _PIPE_FLUSH_SIZE:
+                self._send(whole_chunks=True)
+        return len(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._send(whole_chunks=False)
+
+    def _send(self, whole_chunks: bool) -> None:
+        """按 _PIPE_FLUSH_SIZE 分块发送缓存的输出，whole_chunks 为真时不足一块的部分留在缓存中（调用方持有锁）"""
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        end = len(data) - len(data) % _PIPE_FLUSH_SIZE if whole_chunks else len(data)
+        rest = data[end:]
+        self._buffer, self._size = ([rest], len(rest)) if rest else ([], 0)
+        for start in range(0, end, _PIPE_FLUSH_SIZE):
+            self.channel.send((self.stream, data[start:start + _PIPE_FLUSH_SIZE]))
+
+def _flush_loop(writers: List[_PipeWriter]) -> None:
+    """刷新线程：定期发送缓存中不足一块的输出"""
+    while True:
+        time.sleep(_PIPE_FLUSH_INTERVAL)
+        try:
+            for writer in writers:
+                writer.flush()
+        except (EOFError, OSError):
+            return
+
+def _preload(modules: List[str]) -> None:
+    """预先导入常用模块，导入失败时忽略"""
+    # 工作进程没有显示设备
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Failed to preload module {module}: {str(e)}")
+
+class CPULimitExceeded(BaseException):
+    """代码执行超出CPU时间限制（由 SIGXCPU 触发），继承 BaseException 以免被用户代码捕获"""
+
+def _on_cpu_limit(signum: int, frame: Any) -> None:
+    raise CPULimitExceeded()
+
+def _statm(field: int) -> int:
+    """读取 /proc/self/statm 中的页数并转换为字节"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[field]) * os.sysconf("SC_PAGE_SIZE")
+
+def _rss() -> int:
+    """当前进程的常驻内存（字节）"""
+    try:
+        return _statm(1)
+    except (OSError, ValueError, AttributeError):
+        # 非 Linux 平台只能取得峰值
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+def _reset_peak_rss() -> None:
+    """重置内核记录的常驻内存峰值（Linux），使峰值只反映本次执行"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _peak_rss() -> int:
+    """常驻内存峰值（字节），无法重置峰值的平台为进程生命周期内的峰值"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+def _apply_limits(limits: Dict[str, Any]) -> Dict[int, Any]:
+    """按本次执行的限制降低软限制，返回原来的限制用于恢复
+
+    工作进程常驻复用，只调整软限制（硬限制降低后无法恢复）：
+    - memory_mb：在当前地址空间之外最多再分配的内存（RLIMIT_AS）
+    - cpu_seconds：本次执行可用的CPU时间（RLIMIT_CPU，超出时收到 SIGXCPU）
+    - max_files：可同时打开的文件数（RLIMIT_NOFILE）
+    """
+    previous: Dict[int, Any] = {}
+    if resource is None:
+        return previous
+
+    def lower(limit: int, value: int) -> None:
+        soft, hard = resource.getrlimit(limit)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        previous[limit] = (soft, hard)
+        resource.setrlimit(limit, (value, hard))
+
+    try:
+        if limits.get("memory_mb"):
+            lower(resource.RLIMIT_AS, _statm(0) + int(limits["memory_mb"] * 1024 * 1024))
+    except (OSError, ValueError, AttributeError):
+        pass
+    if limits.get("cpu_seconds"):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        lower(resource.RLIMIT_CPU, int(math.ceil(usage.ru_utime + usage.ru_stime + limits["cpu_seconds"])))
+    if limits.get("max_files"):
+        lower(resource.RLIMIT_NOFILE, int(limits["max_files"]))
+    return previous
+
+def _restore_limits(previous: Dict[int, Any]) -> None:
+    for limit, value in previous.items():
+        resource.setrlimit(limit, value)
+
+def _reset_state(stdout: _PipeWriter, stderr: _PipeWriter) -> None:
+    """清理上一次执行留下的全局状态"""
+    sys.stdout, sys.stderr = stdout, stderr
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    if pyplot is not None:
+        pyplot.close("all")
+
+def _worker_main(conn: Any, preload: List[str]) -> None:
+    """工作进程主循环：接收编译后的代码，在独立的命名空间中执行，通过管道返回输出和结果
+
+    消息协议（子进程 -> 父进程）：
+    ("stdout", text) / ("stderr", text)：输出分块
+    ("result", {"status": ..., "error": ..., "usage": ..., "rss": ...})：执行结束或健康检查响应
+    """
+    # forkserver 方式下模块已在模板进程中导入，这里不会重复导入
+    _preload(preload)
+    channel = _Channel(conn)
+    stdout = _PipeWriter(channel, "stdout")
+    stderr = _PipeWriter(channel, "stderr")
+    sys.stdout, sys.stderr = stdout, stderr
+    threading.Thread(target=_flush_loop, args=([stdout, stderr],), daemon=True).start()
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        if job.get("ping"):
+            try:
+                channel.send(("result", {"status": "ok", "error": None, "rss": _rss()}))
+                continue
+            except (EOFError, OSError):
+                return
+
+        # 每个任务使用新的命名空间，任务之间不共享变量
+        namespace = {"__name__": "__main__", "__builtins__": builtins}
+        code = marshal.loads(job["code"])
+        _reset_peak_rss()
+        started, cpu_started = time.perf_counter(), time.process_time()
+        previous = _apply_limits(job.get("limits") or {})
+        try:
+            exec(code, namespace)
+            result = {"status": "completed", "error": None}
+        except CPULimitExceeded:
+            result = {"status": "error", "error": "CPU time limit exceeded"}
+        except MemoryError:
+            result = {"status": "error", "error": "Memory limit exceeded"}
+        except BaseException as e:
+            # 去掉工作进程自身的栈帧，只保留用户代码的调用栈
+            trace = "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+            result = {"status": "error", "error": f"Execution error: {str(e)}\n{trace}"}
+        finally:
+            _restore_limits(previous)
+        result["usage"] = {
+            "wall_time": time.perf_counter() - started,
+            "cpu_time": time.process_time() - cpu_started,
+            "peak_rss": _peak_rss()
+        }
+        try:
+            stdout.flush()
+            stderr.flush()
+            _reset_state(stdout, stderr)
+            result["rss"] = _rss()
+            channel.send(("result", result))
+        except (EOFError, OSError):
+            return
+
+class _Job:
+    """父进程中正在执行的任务"""
+
+    def __init__(self, on_output: Optional[Callable[[str], None]]):
+        self.on_output = on_output
+        # 标准输出超过上限时完整内容写入文件，标准错误只保留最新部分
+        self.stdout = OutputBuffer()
+        self.stderr = OutputBuffer(spill_size=0)
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending: List[str] = []
+        self._pending_size = 0
+
+    def write_stdout(self, text: str) -> None:
+        """记录标准输出；同一次读取到的多个分块合并到约 _PIPE_FLUSH_SIZE 后再交给 on_output"""
+        self.stdout.write(text)
+        if self.on_output is None:
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= _PIPE_FLUSH_SIZE:
+            self.flush_output()
+
+    def flush_output(self) -> None:
+        if self._pending:
+            text, self._pending, self._pending_size = "".join(self._pending), [], 0
+            self.on_output(text)
+
+_main_lock = threading.Lock()
+
+@contextmanager
+def _hidden_main() -> Iterator[None]:
+    """启动工作进程期间用空模块替换 __main__
+
+    spawn/forkserver 会把 __main__ 的模块名或路径传给子进程，子进程以 __mp_main__ 重新导入，
+    执行启动脚本的模块级代码（例如 python -m src.api.rest.main 时创建应用、初始化数据库）。
+    工作进程的入口在本模块中，不需要 __main__。
+    """
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+class _Worker:
+    """父进程中对单个工作进程的封装，通过事件循环监听管道"""
+
+    def __init__(self, context: Any, preload: List[str]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        with _hidden_main():
+            self.process.start()
+        child_conn.close()
+        self.job: Optional[_Job] = None
+        self.jobs = 0
+        self.rss = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive() and not self.conn.closed
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """在事件循环中注册管道读回调"""
+        self._loop = loop
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+
+    def submit(self, code: bytes, limits: Optional[Dict[str, Any]], job: _Job) -> None:
+        self.job = job
+        self.jobs += 1
+        self.conn.send({"code": code, "limits": limits})
+
+    def ping(self, job: _Job) -> None:
+        self.job = job
+        self.conn.send({"ping": True})
+
+    def _on_readable(self) -> None:
+        try:
+            # 每次最多处理 _PIPE_MAX_READ_MESSAGES 条消息，大量输出不会长时间占用事件循环
+            for _ in range(_PIPE_MAX_READ_MESSAGES):
+                if not self.conn.poll():
+                    break
+                stream, data = self.conn.recv()
+                job = self.job
+                if job is None:
+                    continue
+                if stream == "result":
+                    self.job = None
+                    self.rss = data.get("rss", self.rss)
+                    job.flush_output()
+                    if not job.done.done():
+                        job.done.set_result(data)
+                elif stream == "stdout":
+                    job.write_stdout(data)
+                else:
+                    job.stderr.write(data)
+            if self.job is not None:
+                self.job.flush_output()
+        except (EOFError, OSError):
+            # 工作进程退出，管道关闭
+            self._detach()
+            job, self.job = self.job, None
+            if job is not None:
+                job.flush_output()
+            if job is not None and not job.done.done():
+                job.done.set_exception(RuntimeError(
+                    f"Code worker exited unexpectedly with code {self.process.exitcode}"
+                ))
+
+    def _detach(self) -> None:
+        if self._loop is not None and not self.conn.closed:
+            self._loop.remove_reader(self.conn.fileno())
+        self._loop = None
+
+    def stop(self) -> None:
+        """通知工作进程退出"""
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self._detach()
+        self.conn.close()
+
+    def kill(self) -> None:
+        """强制结束工作进程"""
+        self._detach()
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class CodeWorkerPool:
+    """代码执行进程池
+
+    代码在独立的工作进程中执行，事件循环只负责收发管道消息，不会被用户代码阻塞；
+    多个工作进程可以并行利用多核。
+
+    工作进程常驻并在任务之间复用：forkserver 方式下从已导入 CODE_WORKER_PRELOAD 的模板进程派生，
+    start() 后始终保持 size 个预热的进程。执行 max_jobs 次或常驻内存超过 max_memory 的进程被回收，
+    空闲进程定期做健康检查；超时或任务取消时直接结束执行该任务的进程。
+    """
+
+    def __init__(self, size: Optional[int] = None, start_method: Optional[str] = None,
+                 max_jobs: Optional[int] = None, max_memory_mb: Optional[int] = None,
+                 preload: Optional[List[str]] = None):
+        self.size = size or settings.CODE_WORKERS
+        self.max_jobs = max_jobs or settings.CODE_WORKER_MAX_JOBS
+        self.max_memory = (max_memory_mb or settings.CODE_WORKER_MAX_MEMORY_MB) * 1024 * 1024
+        self.preload = list(settings.CODE_WORKER_PRELOAD if preload is None else preload)
+        start_method = start_method or settings.CODE_WORKER_START_METHOD
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # 模板进程导入一次，派生的工作进程直接继承
+            self._context.set_forkserver_preload([__name__, *self.preload])
+        self._idle: List[_Worker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._warming: Optional[asyncio.Task] = None
+        self._health_check: Optional[asyncio.Task] = None
+        self._started = False
+        self.busy = 0
+        self.started = 0
+        self.killed = 0
+        self.recycled = 0
+        self.unhealthy = 0
+        self.completed = 0
+
+    async def start(self) -> None:
+        """预先启动工作进程并开始健康检查"""
+        if self._started:
+            return
+        self._started = True
+        self._health_check = asyncio.create_task(self._health_loop())
+        self._replenish()
+
+    async def run(self, code: bytes, timeout: float,
+                  on_output: Optional[Callable[[str], None]] = None,
+                  limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在工作进程中执行 marshal 序列化的代码对象
+
+        on_output 在事件循环中接收标准输出分块（工作进程按大小或时间合并，每块约 _PIPE_FLUSH_SIZE 个字符）；limits 为本次执行的资源限制（见 _apply_limits）。
+        结果的 output 为内存中保留的输出，超过 CODE_OUTPUT_SPILL_SIZE 时只保留最新部分，
+        output_info 记录输出总长度、是否截断以及完整输出文件。
+        结果的 usage 包含墙钟时间、CPU时间（秒）和常驻内存峰值（字节），被结束的执行只有墙钟时间。
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            worker = await self._acquire()
+            job = _Job(on_output)
+            healthy = False
+            started = time.perf_counter()
+            try:
+                worker.submit(code, limits, job)
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(job.done), timeout=timeout)
+                    healthy = True
+                except asyncio.TimeoutError:
+                    result = {"status": "timeout", "error": f"Code execution timed out after {timeout} seconds"}
+                except RuntimeError as e:
+                    result = {"status": "error", "error": str(e)}
+            finally:
+                self._release(worker, healthy)
+                await job.stdout.aclose()
+
+        self.completed += 1
+        return {
+            "status": result["status"],
+            "output": job.stdout.getvalue(),
+            "output_info": job.stdout.info(),
+            "error": result["error"] or job.stderr.getvalue(),
+            "usage": result.get("usage") or {
+                "wall_time": time.perf_counter() - started,
+                "cpu_time": None,
+                "peak_rss": None
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def shutdown(self) -> None:
+        """停止预热和健康检查，结束所有空闲工作进程"""
+        self._started = False
+        for background in (self._warming, self._health_check):
+            if background is not None:
+                background.cancel()
+        await asyncio.gather(
+            *(t for t in (self._warming, self._health_check) if t is not None),
+            return_exceptions=True
+        )
+        self._warming = self._health_check = None
+
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+        await asyncio.gather(
+            *(asyncio.to_thread(worker.process.join, 1) for worker in idle),
+            return_exceptions=True
+        )
+        for worker in idle:
+            if worker.process.is_alive():
+                worker.process.kill()
+
+    def stats(self) -> Dict[str, int]:
+        """进程池状态"""
+        return {
+            "size": self.size,
+            "busy": self.busy,
+            "idle": len(self._idle),
+            "started": self.started,
+            "killed": self.killed,
+            "recycled": self.recycled,
+            "unhealthy": self.unhealthy,
+            "completed": self.completed
+        }
+
+    def _start_worker(self) -> _Worker:
+        """启动工作进程（会阻塞，在线程中调用）"""
+        worker = _Worker(self._context, self.preload)
+        self.started += 1
+        return worker
+
+    async def _acquire(self) -> _Worker:
+        """取出预热的工作进程，没有时启动新进程"""
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                break
+            worker.kill()
+        else:
+            worker = await asyncio.to_thread(self._start_worker)
+        worker.attach(asyncio.get_running_loop())
+        self.busy += 1
+        return worker
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        """任务正常结束的工作进程放回池中；超时、取消或异常退出的进程直接结束，达到回收条件的进程正常退出"""
+        self.busy -= 1
+        worker._detach()
+        if healthy and worker.alive:
+            if worker.jobs < self.max_jobs and worker.rss < self.max_memory:
+                self._idle.append(worker)
+                return
+            worker.stop()
+            self.recycled += 1
+        else:
+            worker.kill()
+            self.killed += 1
+        # 在后台回收进程并补充预热的进程
+        asyncio.get_running_loop().run_in_executor(None, worker.process.join, 1)
+        self._replenish()
+
+    def _replenish(self) -> None:
+        """在后台补充预热的工作进程"""
+        if self._started and (self._warming is None or self._warming.done()):
+            self._warming = asyncio.create_task(self._warm())
+
+    async def _warm(self) -> None:
+        while self._started and len(self._idle) + self.busy < self.size:
+            try:
+                worker = await asyncio.to_thread(self._start_worker)
+            except Exception as e:
+                logger.error(f"Failed to start code worker: {str(e)}")
+                return
+            if not self._started:
+                worker.stop()
+                return
+            self._idle.append(worker)
+
+    async def _health_loop(self) -> None:
+        """定期检查空闲工作进程并清理过期的输出文件"""
+        while True:
+            await asyncio.sleep(settings.CODE_WORKER_HEALTH_INTERVAL)
+            try:
+                await self._check_idle()
+                await asyncio.to_thread(prune_output_files)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Code worker health check failed: {str(e)}")
+
+    async def _check_idle(self) -> None:
+        """逐个检查空闲工作进程，无响应或内存超限的进程被替换"""
+        for worker in list(self._idle):
+            if worker not in self._idle:
+                # 检查期间已被取走
+                continue
+            self._idle.remove(worker)
+            if await self._ping(worker):
+                self._idle.append(worker)
+                continue
+            worker.kill()
+            self.unhealthy += 1
+            asyncio.get_running_loop().run_in_executor(None, worker.process.join, 1)
+        self._replenish()
+
+    async def _ping(self, worker: _Worker) -> bool:
+        if not worker.alive:
+            return False
+        job = _Job(None)
+        worker.attach(asyncio.get_running_loop())
+        try:
+            worker.ping(job)
+            await asyncio.wait_for(asyncio.shield(job.done), timeout=settings.CODE_WORKER_HEALTH_TIMEOUT)
+            return worker.rss < self.max_memory
+        except (asyncio.TimeoutError, RuntimeError, OSError):
+            return False
+        finally:
+            worker._detach()
+
+# 进程内共享的代码执行进程池
+code_worker_pool = CodeWorkerPool()
@@ -0,0 +1,146 @@
+from typing import Dict, Any, Optional
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from src.common.config.settings import settings
+from src.core.task.shared_queue import create_shared_queue
+from ..controller.controller_agent import ControllerAgent
+
+logger = logging.getLogger(__name__)
+
+class TaskWorker:
+    """执行进程：从共享队列租用任务，在本进程内执行并写回状态
+
+    执行中的任务定期续约，写回最终状态后确认；进程退出时未确认的任务在租约到期后由其他进程重新执行。
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or settings.MAX_WORKERS
+        self.shared_queue = create_shared_queue()
+        self.controller = ControllerAgent(mode="local", resume_tasks=False)
+        self._active: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        """循环取任务执行，直到进程被终止"""
+        await self.shared_queue.initialize()
+        if not await self.controller.initialize():
+            raise RuntimeError("Failed to initialize worker controller")
+        watcher = asyncio.gather(self._watch_cancellations(), self._renew_leases())
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Worker {os.getpid()} started with concurrency {self.concurrency}")
+        try:
+            while True:
+                await slots.acquire()
+                task = await self.shared_queue.pop(timeout=1.0)
+                if task is None:
+                    slots.release()
+                    continue
+                task_id = task["task_id"]
+                runner = asyncio.create_task(self._process(task))
+                self._active[task_id] = runner
+                runner.add_done_callback(lambda _, task_id=task_id: self._finish(task_id, slots))
+        finally:
+            watcher.cancel()
+            for runner in list(self._active.values()):
+                runner.cancel()
+            await asyncio.gather(watcher, *self._active.values(), return_exceptions=True)
+            await self.controller.cleanup()
+            await self.shared_queue.cleanup()
+
+    def _finish(self, task_id: str, slots: asyncio.Semaphore) -> None:
+        """任务结束后释放并发槽位"""
+        self._active.pop(task_id, None)
+        slots.release()
+
+    async def _process(self, task: Dict[str, Any]) -> None:
+        """执行单个任务，写回最终状态后确认"""
+        task_id = task["task_id"]
+        try:
+            await self._execute(task)
+        except asyncio.CancelledError:
+            # 进程退出，任务在租约到期后重新入队
+            raise
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} failed on task {task_id}: {str(e)}")
+            await self.shared_queue.set_state(task_id, {
+                "task_id": task_id,
+                "status": "error",
+                "error": str(e)
+            })
+        await self.shared_queue.ack(task_id)
+
+    async def _execute(self, task: Dict[str, Any]) -> None:
+        """执行任务并写回最终状态，已取消或已结束的任务直接跳过"""
+        task_id = task["task_id"]
+        if not await self.shared_queue.claim(task_id, {"status": "running", "worker": os.getpid()}):
+            # 出队前已被取消，或者是写回状态后未确认的重复投递
+            return
+
+        await self.controller.submit_tasks([task])
+        response = await self.controller.wait_for_task(task_id)
+        if response["status"] == "cancelled":
+            # 取消状态已由API进程写入
+            return
+        await self.shared_queue.set_state(task_id, response)
+
+    async def _renew_leases(self) -> None:
+        """定期为执行中的任务续约"""
+        interval = max(settings.SHARED_QUEUE_LEASE_TIMEOUT / 3, settings.SHARED_QUEUE_POLL_INTERVAL)
+        while True:
+            await asyncio.sleep(interval)
+            task_ids = list(self._active)
+            if not task_ids:
+                continue
+            try:
+                await self.shared_queue.renew(task_ids)
+            except Exception as e:
+                logger.error(f"Failed to renew task leases: {str(e)}")
+
+    async def _watch_cancellations(self) -> None:
+        """轮询运行中任务的共享状态，中止已被取消的任务"""
+        while True:
+            await asyncio.sleep(settings.SHARED_QUEUE_POLL_INTERVAL)
+            task_ids = list(self._active)
+            if not task_ids:
+                continue
+            try:
+                states = await self.shared_queue.get_states(task_ids)
+            except Exception as e:
+                logger.error(f"Failed to read shared task states: {str(e)}")
+                continue
+            for task_id, state in states.items():
+                if state.get("status") == "cancelled":
+                    await self.controller.cancel_task(task_id)
+
+def run_worker(concurrency: Optional[int] = None) -> None:
+    """执行进程入口"""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(TaskWorker(concurrency).run())
+    except KeyboardInterrupt:
+        pass
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start task worker processes")
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    parser.add_argument("--concurrency", type=int, default=settings.MAX_WORKERS)
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.concurrency,), name=f"task-worker-{index}")
+        for index in range(max(args.processes, 1))
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
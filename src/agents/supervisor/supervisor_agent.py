@@ -1,25 +1,57 @@
-from typing import Dict, Any, List, Optional
-from ..base import BaseAgent, AgentRegistry
+from typing import Dict, Any, List, Deque
+from collections import deque
+from ..base import BaseAgent, AgentState
 import asyncio
 import uuid
 from datetime import datetime
 import logging
 from src.common.config.settings import settings
+from src.common.events.event_bus import EventBus, EventTypes
+
+# 监督代理订阅的事件
+SUPERVISED_EVENT_TYPES = [
+    EventTypes.AGENT_STATE_CHANGED,
+    EventTypes.TASK_STARTED,
+    EventTypes.TASK_COMPLETED,
+    EventTypes.TASK_FAILED,
+    EventTypes.TASK_CANCELLED
+]
 
 class SupervisorAgent(BaseAgent):
-    """监督代理实现"""
-    
+    """监督代理实现
+
+    订阅代理和任务事件，事件回调只写入队列，由后台协程消费并增量更新监控快照，
+    不阻塞任务执行路径，也不再周期性扫描 AgentRegistry。
+    """
+
     def __init__(self):
         super().__init__(f"supervisor_{uuid.uuid4().hex[:8]}")
         self.monitored_agents: Dict[str, Dict[str, Any]] = {}
-        self.performance_metrics: Dict[str, List[Dict[str, Any]]] = {}
+        self.performance_metrics: Dict[str, Deque[Dict[str, Any]]] = {}
         self.alerts: List[Dict[str, Any]] = []
+        self.task_stats: Dict[str, Any] = {
+            "running": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "avg_duration": 0.0
+        }
+        self.event_bus = EventBus()
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=settings.SUPERVISOR_QUEUE_SIZE)
+        self.dropped_events = 0
+        self._task_started: Dict[str, datetime] = {}
+        self._workers: List[asyncio.Task] = []
 
     async def initialize(self) -> bool:
         """初始化监督代理"""
         try:
-            # 开始监控循环
-            asyncio.create_task(self._monitoring_loop())
+            for event_type in SUPERVISED_EVENT_TYPES:
+                self.event_bus.subscribe(event_type, self._enqueue)
+            # 启动事件消费和停滞检查协程
+            self._workers = [
+                asyncio.create_task(self._consume_events()),
+                asyncio.create_task(self._monitoring_loop())
+            ]
             await self.update_state("ready")
             self.logger.info(f"Supervisor {self.agent_id} initialized")
             return True
@@ -54,72 +86,122 @@ class SupervisorAgent(BaseAgent):
     async def cleanup(self) -> bool:
         """清理资源"""
         try:
+            for event_type in SUPERVISED_EVENT_TYPES:
+                self.event_bus.unsubscribe(event_type, self._enqueue)
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
             self.monitored_agents = {}
             self.performance_metrics = {}
             self.alerts = []
+            self._task_started = {}
             await self.update_state("shutdown")
             return True
         except Exception as e:
             await self.handle_error(e)
             return False
 
+    def get_state(self) -> AgentState:
+        """获取代理状态"""
+        state = super().get_state()
+        state.metadata["supervision"] = {
+            "monitored_agents": len(self.monitored_agents),
+            "queued_events": self.events.qsize(),
+            "dropped_events": self.dropped_events,
+            "alerts": len(self.alerts),
+            "tasks": dict(self.task_stats)
+        }
+        return state
+
+    async def _enqueue(self, event: Dict[str, Any]) -> None:
+        """事件回调：只入队，队列满时丢弃"""
+        try:
+            self.events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped_events += 1
+
+    async def _consume_events(self) -> None:
+        """消费事件队列"""
+        while True:
+            event = await self.events.get()
+            try:
+                self._apply_event(event)
+            except Exception as e:
+                self.logger.error(f"Failed to process event {event.get('type')}: {str(e)}")
+
+    def _apply_event(self, event: Dict[str, Any]) -> None:
+        """根据单个事件增量更新监控快照"""
+        event_type = event["type"]
+        data = event.get("data") or {}
+        timestamp = datetime.fromisoformat(event["timestamp"])
+        
+        if event_type == EventTypes.AGENT_STATE_CHANGED:
+            self._update_agent(data, timestamp)
+            return
+        
+        task_id = data.get("task_id")
+        if event_type == EventTypes.TASK_STARTED:
+            self._task_started[task_id] = timestamp
+            self.task_stats["running"] += 1
+            return
+        
+        started = self._task_started.pop(task_id, None)
+        if started is not None:
+            self.task_stats["running"] -= 1
+            duration = (timestamp - started).total_seconds()
+            self.task_stats["avg_duration"] = 0.9 * self.task_stats["avg_duration"] + 0.1 * duration
+        if event_type == EventTypes.TASK_COMPLETED:
+            self.task_stats["completed"] += 1
+        elif event_type == EventTypes.TASK_FAILED:
+            self.task_stats["failed"] += 1
+        else:
+            self.task_stats["cancelled"] += 1
+
+    def _update_agent(self, data: Dict[str, Any], timestamp: datetime) -> None:
+        """更新单个代理的状态和性能指标"""
+        agent_id = data["agent_id"]
+        status = data["status"]
+        if status == "shutdown":
+            # 代理已退出，不再监控
+            self.monitored_agents.pop(agent_id, None)
+            self.performance_metrics.pop(agent_id, None)
+            return
+        
+        agent = self.monitored_agents.setdefault(agent_id, {"task_count": 0})
+        if data.get("previous") == "processing" and status == "completed":
+            agent["task_count"] += 1
+        agent["status"] = status
+        agent["last_update"] = timestamp
+        
+        metrics = self.performance_metrics.setdefault(agent_id, deque(maxlen=100))
+        metrics.append({
+            "timestamp": timestamp,
+            "state": status,
+            "task_count": agent["task_count"]
+        })
+        
+        if status == "error":
+            self._add_alert(agent_id, "error", f"Agent {agent_id} is in error state: {data.get('error')}")
+
     async def _monitoring_loop(self) -> None:
-        """监控循环"""
+        """停滞检查循环，只检查增量维护的快照"""
         while True:
             try:
-                await self._update_agent_states()
-                await self._check_performance()
+                await asyncio.sleep(settings.SUPERVISOR_CHECK_INTERVAL)
                 await self._generate_alerts()
-                await asyncio.sleep(settings.TASK_TIMEOUT)  # 监控间隔
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {str(e)}")
-                await asyncio.sleep(5)  # 错误后短暂等待
-
-    async def _update_agent_states(self) -> None:
-        """更新代理状态"""
-        agents = AgentRegistry.list_agents()
-        for agent_id in agents:
-            agent = AgentRegistry.get_agent(agent_id)
-            if agent:
-                self.monitored_agents[agent_id] = {
-                    "state": agent.get_state().dict(),
-                    "last_check": datetime.now()
-                }
-
-    async def _check_performance(self) -> None:
-        """检查性能指标"""
-        for agent_id, data in self.monitored_agents.items():
-            metrics = {
-                "timestamp": datetime.now(),
-                "state": data["state"]["status"],
-                "task_count": len(data["state"].get("metadata", {}).get("tasks", [])),
-                "last_update": data["state"]["last_update"]
-            }
-            
-            if agent_id not in self.performance_metrics:
-                self.performance_metrics[agent_id] = []
-            
-            self.performance_metrics[agent_id].append(metrics)
-            
-            # 保持最近100条记录
-            if len(self.performance_metrics[agent_id]) > 100:
-                self.performance_metrics[agent_id] = self.performance_metrics[agent_id][-100:]
 
     async def _generate_alerts(self) -> None:
         """生成告警"""
-        for agent_id, metrics in self.performance_metrics.items():
-            if not metrics:
-                continue
-                
-            latest = metrics[-1]
-            
-            # 检查代理状态
-            if latest["state"] == "error":
-                self._add_alert(agent_id, "error", f"Agent {agent_id} is in error state")
-            
-            # 检查更新时间
-            last_update = latest["last_update"]
-            if (datetime.now() - last_update).total_seconds() > settings.TASK_TIMEOUT:
+        now = datetime.now()
+        for agent_id, agent in self.monitored_agents.items():
+            # 处理中的代理长时间没有状态变化
+            if agent["status"] == "processing" and \
+                    (now - agent["last_update"]).total_seconds() > settings.TASK_TIMEOUT:
                 self._add_alert(agent_id, "warning", f"Agent {agent_id} has not updated for {settings.TASK_TIMEOUT} seconds")
 
     def _add_alert(self, agent_id: str, level: str, message: str) -> None:
@@ -131,12 +213,15 @@ class SupervisorAgent(BaseAgent):
             "message": message
         }
         self.alerts.append(alert)
+        if len(self.alerts) > settings.SUPERVISOR_MAX_ALERTS:
+            del self.alerts[:len(self.alerts) - settings.SUPERVISOR_MAX_ALERTS]
         self.logger.warning(f"Alert generated: {message}")
 
     async def _monitor_agents(self) -> Dict[str, Any]:
         """监控代理状态"""
         return {
             "agents": self.monitored_agents,
+            "tasks": dict(self.task_stats),
             "timestamp": datetime.now().isoformat()
         }
 
@@ -146,9 +231,9 @@ class SupervisorAgent(BaseAgent):
         for agent_id, metrics in self.performance_metrics.items():
             if not metrics:
                 continue
-                
+            
             analysis[agent_id] = {
-                "total_tasks": sum(m["task_count"] for m in metrics),
+                "total_tasks": metrics[-1]["task_count"],
                 "current_state": metrics[-1]["state"],
                 "performance_trend": self._calculate_trend(metrics)
             }
@@ -163,11 +248,11 @@ class SupervisorAgent(BaseAgent):
             "timestamp": datetime.now().isoformat()
         }
 
-    def _calculate_trend(self, metrics: List[Dict[str, Any]]) -> str:
+    def _calculate_trend(self, metrics: Deque[Dict[str, Any]]) -> str:
         """计算性能趋势"""
         if len(metrics) < 2:
             return "stable"
-            
+        
         recent_tasks = metrics[-1]["task_count"]
         previous_tasks = metrics[-2]["task_count"]
         
@@ -176,4 +261,4 @@ class SupervisorAgent(BaseAgent):
         elif recent_tasks < previous_tasks:
             return "decreasing"
         else:
-            return "stable" 
\ No newline at end of file
+            return "stable"
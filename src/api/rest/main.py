@@ -15,7 +15,9 @@ from src.api.rest.routers import (
     tool, agent, system, auth, task, dashboard,
     code_runner, data_analyzer, executor, network
 )  # 导入路由模块
+from src.api.websocket import routes as stream
 from src.database import init_db
+from src.models.task import TaskPriority
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -39,9 +41,6 @@ app.add_middleware(
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 初始化数据库
-init_db()
-
 # 创建API路由
 api_router = FastAPI(title="API")
 
@@ -56,6 +55,7 @@ api_router.include_router(code_runner.router)
 api_router.include_router(data_analyzer.router)
 api_router.include_router(executor.router)
 api_router.include_router(network.router)
+api_router.include_router(stream.router)
 
 # 将API路由挂载到主应用
 app.mount("/api", api_router)
@@ -65,6 +65,9 @@ class TaskRequest(BaseModel):
     content: str
     type: Optional[str] = "general"
     metadata: Optional[Dict[str, Any]] = {}
+    priority: Optional[TaskPriority] = TaskPriority.MEDIUM
+    timeout: Optional[float] = None  # 任务截止时间（秒），默认 settings.TASK_TIMEOUT
+    stream: bool = False  # 工具执行过程中通过事件流推送部分结果
 
 # 响应模型
 class TaskResponse(BaseModel):
@@ -91,9 +94,13 @@ controller: Optional[ControllerAgent] = None
 async def startup_event():
     """应用启动时初始化"""
     global controller
+    # 在启动钩子中初始化数据库，导入本模块不产生副作用
+    init_db()
     controller = ControllerAgent()
     await controller.initialize()
     AgentRegistry.register(controller)
+    # 供子路由通过 request.app.state 访问控制器
+    api_router.state.controller = controller
     logger.info("Application started, controller initialized")
 
 @app.on_event("shutdown")
@@ -106,18 +113,35 @@ async def shutdown_event():
     logger.info("Application shutdown, controller cleaned up")
 
 @app.post("/tasks", response_model=TaskResponse)
-async def create_task(task: TaskRequest):
-    """创建新任务"""
+async def create_task(task: TaskRequest, wait: bool = True):
+    """创建新任务
+
+    wait=false 时任务入队后立即返回任务ID，客户端通过 GET /tasks/{task_id} 查询结果
+    """
     if not controller:
         raise HTTPException(status_code=503, detail="Controller not initialized")
     
+    decision = controller.check_admission(task.priority.value)
+    if not decision.admitted:
+        raise HTTPException(
+            status_code=429,
+            detail=decision.reason,
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+    
     try:
-        result = await controller.process_task({
+        task_id = await controller.submit_task({
             "content": task.content,
             "type": task.type,
-            "metadata": task.metadata
+            "metadata": task.metadata,
+            "priority": task.priority.value,
+            "timeout": task.timeout,
+            "stream": task.stream
         })
+        if not wait:
+            return TaskResponse(task_id=task_id, status="pending")
         
+        result = await controller.wait_for_task(task_id)
         return TaskResponse(
             task_id=result.get("task_id", ""),
             status=result.get("status", "unknown"),
@@ -133,7 +157,7 @@ async def get_task(task_id: str):
     if not controller:
         raise HTTPException(status_code=503, detail="Controller not initialized")
     
-    task = controller.tasks.get(task_id)
+    task = await controller.tasks.fetch(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -143,6 +167,21 @@ async def get_task(task_id: str):
         result=task.get("result")
     )
 
+@app.post("/tasks/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: str):
+    """取消排队中或运行中的任务"""
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not initialized")
+    
+    task = await controller.tasks.fetch(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if not await controller.cancel_task(task_id):
+        raise HTTPException(status_code=409, detail=f"Task already {task['status']}")
+    
+    return TaskResponse(task_id=task_id, status="cancelled")
+
 @app.get("/agents", response_model=Dict[str, List[AgentState]])
 async def list_agents():
     """列出所有代理"""
@@ -179,7 +218,7 @@ async def get_status():
                 metadata=state.metadata
             ))
     
-    # 获取所有任务
+    # 获取最近的任务（各状态计数见 controller.metadata.task_counts）
     tasks = [
         {
             "task_id": task_id,
@@ -187,7 +226,7 @@ async def get_status():
             "created_at": task_data["created_at"].isoformat(),
             "type": task_data["task"].get("type", "general")
         }
-        for task_id, task_data in controller.tasks.items()
+        for task_id, task_data in controller.tasks.recent(settings.STATUS_RECENT_TASKS)
     ]
     
     return SystemStatus(
@@ -1,16 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
+import logging
 import uuid
 
 from src.common.security.middleware import SecurityDependency
-from src.database import get_db
+from src.common.events.event_bus import EventBus, EventTypes
+from src.database import get_db, SessionLocal
 from sqlalchemy.orm import Session
 from src.models.runtime import Runtime as RuntimeModel
 from src.models.code_execution import CodeExecution
+from src.agents.executor.streaming import ToolChunk, stream_callback
+from src.agents.executor.tools.code_runner import CodeRunner
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/code-runner", tags=["code-runner"])
+code_runner = CodeRunner()
+# 后台执行的任务，保持引用直到执行结束
+_background: Set[asyncio.Task] = set()
 
 class Runtime(BaseModel):
     """运行时环境模型"""
@@ -31,9 +41,9 @@ class ExecutionResult(BaseModel):
     runtime_id: str
     output: Optional[str] = None
     error: Optional[str] = None
-    duration: Optional[float] = None
-    memory_usage: Optional[float] = None
-    cpu_usage: Optional[float] = None
+    duration: Optional[float] = None  # 墙钟时间（秒）
+    memory_usage: Optional[float] = None  # 常驻内存峰值（MB）
+    cpu_usage: Optional[float] = None  # CPU时间（秒）
     status: str = "pending"
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -50,14 +60,85 @@ async def list_runtimes(
     runtimes = db.query(RuntimeModel).filter(RuntimeModel.is_enabled == True).all()
     return runtimes
 
+async def _run(execution_id: str, code: str, timeout: float, limits: Dict[str, Any]) -> Dict[str, Any]:
+    """执行代码，标准输出分块以 code.output 事件发布"""
+    event_bus = EventBus()
+    result: Dict[str, Any] = {}
+    seq = 0
+    output = stream_callback(lambda emit: code_runner.run(
+        code, timeout, on_output=lambda text: emit(text, "stdout"), limits=limits
+    ))
+    try:
+        async for item in output:
+            if isinstance(item, ToolChunk):
+                await event_bus.publish(EventTypes.CODE_OUTPUT, {
+                    "execution_id": execution_id,
+                    "stream": item.kind,
+                    "seq": seq,
+                    "data": item.data
+                })
+                seq += 1
+            else:
+                result = item
+    finally:
+        await output.aclose()
+    return result
+
+def _record(execution: CodeExecution, result: Dict[str, Any]) -> None:
+    """把执行结果写入执行记录，输出被截断时注明完整输出文件"""
+    usage = result.get("usage") or {}
+    output_info = result.get("output_info") or {}
+    output = result.get("output")
+    if output_info.get("truncated"):
+        location = f", full output in {output_info['file']}" if output_info.get("file") else ""
+        output = f"[output truncated: showing last {len(output or '')} of {output_info['size']} characters{location}]\n{output or ''}"
+    execution.status = result.get("status", "error")
+    execution.output = output
+    execution.error = result.get("error") or None
+    execution.duration = usage.get("wall_time")
+    execution.cpu_usage = usage.get("cpu_time")
+    if usage.get("peak_rss") is not None:
+        execution.memory_usage = usage["peak_rss"] / (1024 * 1024)
+
+async def _finish(execution_id: str, status: str) -> None:
+    await EventBus().publish(EventTypes.CODE_FINISHED, {"execution_id": execution_id, "status": status})
+
+async def _run_in_background(execution_id: str, code: str, timeout: float, limits: Dict[str, Any]) -> None:
+    """后台执行代码，结束后使用新的数据库会话更新执行记录"""
+    try:
+        result = await _run(execution_id, code, timeout, limits)
+    except Exception as e:
+        logger.error(f"Code execution {execution_id} failed: {str(e)}")
+        result = {"status": "error", "error": str(e)}
+    db = SessionLocal()
+    try:
+        execution = db.query(CodeExecution).filter(CodeExecution.id == execution_id).first()
+        if execution is not None:
+            _record(execution, result)
+            db.commit()
+    finally:
+        db.close()
+    await _finish(execution_id, result.get("status", "error"))
+
 @router.post("/execute", response_model=ExecutionResult)
 async def execute_code(
     code: str,
     runtime_id: str,
+    timeout: float = 30,
+    memory_limit: Optional[int] = None,
+    cpu_time_limit: Optional[int] = None,
+    max_open_files: Optional[int] = None,
+    wait: bool = True,
     db: Session = Depends(get_db),
     user: Dict = Depends(SecurityDependency())
 ):
-    """执行代码"""
+    """执行代码
+
+    代码在受资源限制的工作进程中执行，memory_limit（MB）、cpu_time_limit（秒）和 max_open_files
+    只能比配置的默认限制更严格；执行记录保存实际的墙钟时间、CPU时间和常驻内存峰值。
+    标准输出在执行过程中通过 /ws/code-runner/executions/{id} 推送；执行记录只保存最新部分的输出，
+    超出部分的完整输出写入文件。wait 为 false 时立即返回 running 状态的执行记录，代码在后台执行
+    """
     # 检查运行时环境是否存在
     runtime = db.query(RuntimeModel).filter(
         RuntimeModel.id == runtime_id,
@@ -71,13 +152,29 @@ async def execute_code(
         id=str(uuid.uuid4()),
         code=code,
         runtime_id=runtime_id,
-        status="pending"
+        status="running"
     )
     db.add(execution)
     db.commit()
-    db.refresh(execution)
 
-    # TODO: 实际的代码执行逻辑
-    # 这里应该异步执行代码，并在执行完成后更新执行记录
-    # 现在我们只是返回执行记录
-    return execution 
\ No newline at end of file
+    limits = {
+        "memory_mb": memory_limit,
+        "cpu_seconds": cpu_time_limit,
+        "max_files": max_open_files
+    }
+    if not runtime.name.lower().startswith("python"):
+        execution.status = "error"
+        execution.error = f"Unsupported runtime: {runtime.name}"
+    elif not wait:
+        background = asyncio.create_task(_run_in_background(execution.id, code, timeout, limits))
+        _background.add(background)
+        background.add_done_callback(_background.discard)
+        db.refresh(execution)
+        return execution
+    else:
+        _record(execution, await _run(execution.id, code, timeout, limits))
+
+    db.commit()
+    db.refresh(execution)
+    await _finish(execution.id, execution.status)
+    return execution
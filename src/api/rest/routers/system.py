@@ -12,6 +12,7 @@ from src.common.events.event_bus import EventBus
 from src.agents.base import AgentRegistry
 from src.core.task.task_manager import TaskManager
 from src.core.tools.tool_manager import ToolManager
+from src.core.tools.resilience import tool_resilience
 
 logger = logging.getLogger(__name__)
 
@@ -214,6 +215,21 @@ async def get_dashboard_metrics(user: Dict = Depends(SecurityDependency())):
         logger.error(f"Failed to get dashboard metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/tools/resilience")
+async def get_tool_resilience(user: Dict = Depends(SecurityDependency())):
+    """获取各工具的熔断器状态和重试计数"""
+    return tool_resilience.stats()
+
+@router.post("/tools/{tool_id}/circuit/reset")
+async def reset_tool_circuit(
+    tool_id: str,
+    user: Dict[str, Any] = Depends(SecurityDependency("system:manage"))
+):
+    """手动关闭工具的熔断器"""
+    if not tool_resilience.reset(tool_id):
+        raise HTTPException(status_code=404, detail="Tool not found")
+    return {"message": f"Circuit for tool {tool_id} reset"}
+
 @router.get("/events", response_model=List[SystemEvent])
 async def get_system_events(
     event_type: Optional[str] = None,
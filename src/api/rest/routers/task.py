@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
 
+from src.common.config.settings import settings
 from src.common.security.middleware import SecurityDependency
 from src.database import get_db
 from src.models.task import Task, TaskType, TaskStatus, TaskPriority
+from src.core.task.admission import AdmissionController
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -44,6 +46,43 @@ class TaskStats(BaseModel):
     failed: int
     pending: int
 
+class TaskBatchItem(BaseModel):
+    """批量任务中的单个任务"""
+    name: str
+    type: str = "general"
+    content: str = ""
+    priority: TaskPriority = TaskPriority.MEDIUM
+    description: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    timeout: Optional[float] = None
+    stream: bool = False
+
+class TaskBatchCreate(BaseModel):
+    """批量创建任务的请求模型"""
+    tasks: List[TaskBatchItem] = Field(..., min_length=1, max_length=settings.TASK_BATCH_MAX_SIZE)
+
+class TaskBatchResponse(BaseModel):
+    """批量创建任务的响应模型，ids 与请求中的任务顺序一致"""
+    ids: List[str]
+
+class TaskBatchStatusRequest(BaseModel):
+    """批量查询任务状态的请求模型"""
+    ids: List[str] = Field(..., min_length=1, max_length=settings.TASK_BATCH_MAX_SIZE)
+
+class TaskBatchStatusItem(BaseModel):
+    """批量查询中的单个任务状态"""
+    id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+def get_controller(request: Request):
+    """获取全局控制器代理"""
+    controller = getattr(request.app.state, "controller", None)
+    if controller is None:
+        raise HTTPException(status_code=503, detail="Controller not initialized")
+    return controller
+
 @router.get("", response_model=List[TaskResponse])
 async def list_tasks(
     db: Session = Depends(get_db),
@@ -87,6 +126,73 @@ async def create_task(
     db.refresh(db_task)
     return TaskResponse.from_orm(db_task)
 
+@router.post("/batch", response_model=TaskBatchResponse)
+async def create_task_batch(
+    batch: TaskBatchCreate,
+    request: Request,
+    user: Dict = Depends(SecurityDependency())
+):
+    """批量创建任务并一起提交到执行队列
+
+    任务由控制器的任务存储统一管理，结束并被淘汰后才写入 tasks 表，这里不再单独写入数据库。
+    """
+    controller = get_controller(request)
+    
+    # 整批按其中最高的优先级进行准入判定
+    priority = max(
+        (item.priority.value for item in batch.tasks),
+        key=lambda p: AdmissionController.SHED_FACTORS[p]
+    )
+    decision = controller.check_admission(priority, count=len(batch.tasks))
+    if not decision.admitted:
+        raise HTTPException(
+            status_code=429,
+            detail=decision.reason,
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+    
+    tasks = [
+        {
+            "task_id": uuid.uuid4().hex,
+            "name": item.name,
+            "type": item.type,
+            "content": item.content,
+            "description": item.description,
+            "metadata": item.metadata or {},
+            "priority": item.priority.value,
+            "timeout": item.timeout,
+            "stream": item.stream
+        }
+        for item in batch.tasks
+    ]
+    
+    ids = await controller.submit_tasks(tasks)
+    return TaskBatchResponse(ids=ids)
+
+@router.post("/batch/status", response_model=List[TaskBatchStatusItem])
+async def get_task_batch_status(
+    query: TaskBatchStatusRequest,
+    request: Request,
+    user: Dict = Depends(SecurityDependency())
+):
+    """批量查询任务状态，结果顺序与请求中的 ids 一致"""
+    controller = get_controller(request)
+    
+    found = await controller.tasks.fetch_many(query.ids)
+    results = []
+    for task_id in query.ids:
+        task = found.get(task_id)
+        if task is None:
+            results.append(TaskBatchStatusItem(id=task_id, status="not_found"))
+            continue
+        results.append(TaskBatchStatusItem(
+            id=task_id,
+            status=task["status"],
+            result=task.get("result"),
+            error=task.get("error")
+        ))
+    return results
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: str,
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, AsyncIterator
+from datetime import datetime
+import asyncio
+import json
+import logging
+
+from src.common.config.settings import settings
+from src.core.task.task_store import TaskStore
+from src.database import SessionLocal
+from src.models.code_execution import CodeExecution
+from .stream import Subscription, TERMINAL_EVENT_TYPES, task_event_stream
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["stream"])
+
+async def _snapshot(controller: Any, task_id: str) -> Optional[Dict[str, Any]]:
+    """任务当前状态，作为连接建立后的第一条消息"""
+    task_data = await controller.tasks.fetch(task_id) if controller else None
+    if not task_data:
+        return None
+    data = {"task_id": task_id, "status": task_data["status"]}
+    if task_data["status"] in TaskStore.FINISHED_STATUSES:
+        data["result"] = task_data.get("result")
+        if task_data.get("error"):
+            data["error"] = task_data["error"]
+    return {"type": "task.snapshot", "data": data, "timestamp": datetime.now().isoformat()}
+
+def _execution_snapshot(execution_id: str) -> Optional[Dict[str, Any]]:
+    """代码执行记录的当前状态，执行已结束时包含输出"""
+    db = SessionLocal()
+    try:
+        execution = db.query(CodeExecution).filter(CodeExecution.id == execution_id).first()
+        if execution is None:
+            return None
+        data = {"execution_id": execution_id, "status": execution.status}
+        if execution.status not in ("pending", "running"):
+            data["output"] = execution.output
+            data["error"] = execution.error
+    finally:
+        db.close()
+    return {"type": "code.snapshot", "data": data, "timestamp": datetime.now().isoformat()}
+
+async def _events(subscription: Subscription, snapshot: Optional[Dict[str, Any]]) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """依次产出快照和订阅事件，空闲时产出 None 作为心跳；单任务订阅在任务结束后停止"""
+    if snapshot is not None:
+        yield snapshot
+        if snapshot["data"]["status"] in TaskStore.FINISHED_STATUSES:
+            return
+    while True:
+        event = await subscription.get(timeout=settings.STREAM_KEEPALIVE_INTERVAL)
+        if event is not None and subscription.dropped:
+            event = {**event, "dropped": subscription.dropped}
+            subscription.dropped = 0
+        yield event
+        if event is not None and subscription.task_id and event["type"] in TERMINAL_EVENT_TYPES:
+            return
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps(event, default=str, ensure_ascii=False)
+
+@router.websocket("/ws/tasks")
+@router.websocket("/ws/tasks/{task_id}")
+async def task_events_websocket(websocket: WebSocket, task_id: Optional[str] = None):
+    """通过 WebSocket 推送任务状态变化、步骤完成和工具输出，不指定任务时推送所有任务"""
+    # 先订阅再读取快照，避免遗漏两者之间发布的事件
+    subscription = task_event_stream.subscribe(task_id)
+    controller = getattr(websocket.app.state, "controller", None)
+    snapshot = await _snapshot(controller, task_id) if task_id else None
+    if task_id and snapshot is None:
+        task_event_stream.unsubscribe(subscription)
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    try:
+        async for event in _events(subscription, snapshot):
+            if event is None:
+                await websocket.send_text(_encode({"type": "ping"}))
+            else:
+                await websocket.send_text(_encode(event))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.debug(f"Task event websocket closed: {str(e)}")
+    finally:
+        task_event_stream.unsubscribe(subscription)
+
+@router.websocket("/ws/code-runner/executions/{execution_id}")
+async def code_output_websocket(websocket: WebSocket, execution_id: str):
+    """通过 WebSocket 推送代码执行的标准输出分块，执行结束后关闭连接"""
+    subscription = task_event_stream.subscribe(execution_id)
+    try:
+        snapshot = await asyncio.to_thread(_execution_snapshot, execution_id)
+        if snapshot is None:
+            await websocket.close(code=4404)
+            return
+
+        await websocket.accept()
+        await websocket.send_text(_encode(snapshot))
+        if "output" in snapshot["data"]:
+            await websocket.close()
+            return
+        async for event in _events(subscription, None):
+            await websocket.send_text(_encode(event if event is not None else {"type": "ping"}))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.debug(f"Code output websocket closed: {str(e)}")
+    finally:
+        task_event_stream.unsubscribe(subscription)
+
+@router.get("/tasks/{task_id}/events")
+async def task_events_sse(task_id: str, request: Request):
+    """通过 Server-Sent Events 推送单个任务的进度，任务结束后关闭连接"""
+    subscription = task_event_stream.subscribe(task_id)
+    snapshot = await _snapshot(getattr(request.app.state, "controller", None), task_id)
+    if snapshot is None:
+        task_event_stream.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for event in _events(subscription, snapshot):
+                if event is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {_encode(event)}\n\n"
+        finally:
+            task_event_stream.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
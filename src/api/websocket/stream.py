@@ -0,0 +1,107 @@
+from typing import Dict, Any, Optional, Set
+import asyncio
+import logging
+
+from src.common.config.settings import settings
+from src.common.events.event_bus import EventBus, EventTypes
+
+logger = logging.getLogger(__name__)
+
+# 推送给客户端的事件类型
+STREAM_EVENT_TYPES = [
+    EventTypes.TASK_CREATED,
+    EventTypes.TASK_STARTED,
+    EventTypes.TASK_STEP_COMPLETED,
+    EventTypes.TOOL_OUTPUT,
+    EventTypes.TASK_COMPLETED,
+    EventTypes.TASK_FAILED,
+    EventTypes.TASK_CANCELLED,
+    EventTypes.CODE_OUTPUT,
+    EventTypes.CODE_FINISHED
+]
+
+# 任务（或代码执行）结束事件，单任务订阅收到后关闭连接
+TERMINAL_EVENT_TYPES = {
+    EventTypes.TASK_COMPLETED,
+    EventTypes.TASK_FAILED,
+    EventTypes.TASK_CANCELLED,
+    EventTypes.CODE_FINISHED
+}
+
+class Subscription:
+    """单个连接的事件订阅，缓冲区满时丢弃最旧的事件，慢客户端不会阻塞事件发布"""
+
+    def __init__(self, task_id: Optional[str] = None, buffer_size: Optional[int] = None):
+        self.task_id = task_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size or settings.STREAM_BUFFER_SIZE)
+        self.dropped = 0
+
+    def push(self, event: Dict[str, Any]) -> None:
+        """写入事件"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """读取下一个事件，超时返回 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class TaskEventStream:
+    """任务事件分发
+
+    每种事件类型只向 EventBus 注册一次，再按 task_id 分发到各连接的订阅，
+    连接数增加时不会增加事件发布的开销。代码执行事件按 execution_id 分发。
+    """
+
+    def __init__(self, event_bus: Optional[EventBus] = None):
+        self.event_bus = event_bus or EventBus()
+        self._by_task: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()
+        self._started = False
+
+    def subscribe(self, task_id: Optional[str] = None) -> Subscription:
+        """订阅单个任务的事件，task_id 为空时订阅所有任务"""
+        if not self._started:
+            for event_type in STREAM_EVENT_TYPES:
+                self.event_bus.subscribe(event_type, self._dispatch)
+            self._started = True
+
+        subscription = Subscription(task_id)
+        if task_id is None:
+            self._all.add(subscription)
+        else:
+            self._by_task.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """取消订阅"""
+        if subscription.task_id is None:
+            self._all.discard(subscription)
+            return
+        subscriptions = self._by_task.get(subscription.task_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_task[subscription.task_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """订阅统计"""
+        return {
+            "task_subscriptions": sum(len(subscriptions) for subscriptions in self._by_task.values()),
+            "global_subscriptions": len(self._all)
+        }
+
+    async def _dispatch(self, event: Dict[str, Any]) -> None:
+        """按任务ID（代码执行事件为执行ID）分发事件"""
+        data = event.get("data") or {}
+        task_id = data.get("task_id", data.get("execution_id")) if isinstance(data, dict) else None
+        for subscription in self._by_task.get(task_id, ()):
+            subscription.push(event)
+        for subscription in self._all:
+            subscription.push(event)
+
+task_event_stream = TaskEventStream()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, List
 import os
 from dotenv import load_dotenv
 
@@ -28,7 +28,88 @@ class Settings(BaseSettings):
     # 资源限制
     MAX_WORKERS: int = 4
     TASK_TIMEOUT: int = 300  # 秒
-    MAX_MEMORY: int = 1024  # MB
+    MAX_MEMORY: int = 1024  # MB，同时也是单次代码执行可分配的内存上限
+    SCHEDULER_AGING_INTERVAL: float = 30.0  # 任务每等待该秒数有效优先级提升一级
+    
+    # 准入控制配置（超出阈值返回 429，低优先级任务先被拒绝）
+    ADMISSION_MAX_PENDING: int = 1000  # 排队与在途任务总数上限
+    ADMISSION_MAX_RETRY_AFTER: int = 60  # Retry-After 上限（秒）
+    
+    # 执行代理池配置
+    EXECUTOR_POOL_MIN: int = 1
+    EXECUTOR_POOL_MAX: int = 4
+    EXECUTOR_POOL_SCALE_UP_LOAD: int = 1  # 所有代理在途任务数达到该值时扩容
+    EXECUTOR_POOL_IDLE_TIMEOUT: int = 60  # 多余代理空闲回收时间（秒）
+    TOOL_TIMEOUT: float = 60.0  # 单个工具的执行超时（秒），不超过任务截止时间
+    TOOL_MAX_CONCURRENCY: int = 4  # 单个任务内并发执行的工具数上限
+    TOOL_POOL_MAX_IDLE: int = 4  # 有状态工具（数据分析）每个执行代理保留的空闲实例数
+    TOOL_SELECTION_CACHE_SIZE: int = 1024  # 工具选择结果缓存条数
+    TOOL_STREAM_PAGE_SIZE: int = 500  # 流式读取CSV时每个分块的行数
+    TOOL_STREAM_CHUNK_SIZE: int = 65536  # 流式读取响应体时每个分块的字节数
+    TOOL_STREAM_MAX_PENDING: int = 256  # 回调式工具等待推送的最大分块数，超出时丢弃最旧的分块
+    CODE_WORKERS: int = 4  # 代码执行工作进程数，即同时执行的代码数上限
+    CODE_WORKER_START_METHOD: str = "forkserver"  # 工作进程启动方式，不支持时使用 spawn
+    CODE_WORKER_PRELOAD: List[str] = ["numpy", "pandas", "matplotlib"]  # 工作进程预先导入的模块
+    CODE_WORKER_MAX_JOBS: int = 100  # 工作进程执行多少次代码后回收
+    CODE_WORKER_MAX_MEMORY_MB: int = 512  # 工作进程常驻内存超过该值（MB）后回收
+    CODE_WORKER_HEALTH_INTERVAL: float = 30.0  # 空闲工作进程健康检查间隔（秒）
+    CODE_WORKER_HEALTH_TIMEOUT: float = 5.0  # 健康检查响应超时（秒）
+    CODE_CACHE_SIZE: int = 256  # 编译结果缓存条数
+    CODE_CPU_TIME_LIMIT: int = 60  # 单次代码执行的CPU时间上限（秒），0 表示不限制
+    CODE_MAX_OPEN_FILES: int = 64  # 单次代码执行可同时打开的文件数上限，0 表示不限制
+    CODE_OUTPUT_TAIL_SIZE: int = 64 * 1024  # 输出截断后内存中保留的最新输出字符数
+    CODE_OUTPUT_SPILL_SIZE: int = 1024 * 1024  # 输出超过该字符数后完整输出写入文件，0 表示不落盘只保留最新部分
+    CODE_OUTPUT_DIR: str = "./data/code_outputs"
+    CODE_OUTPUT_RETENTION: int = 24 * 3600  # 输出文件保留时间（秒）
+    TOOL_RETRY_MAX_ATTEMPTS: int = 3  # 瞬时错误的最大尝试次数（工具元数据未声明时）
+    TOOL_RETRY_BASE_DELAY: float = 0.5  # 重试退避的基础等待时间（秒），按次数指数增长并加随机抖动
+    TOOL_RETRY_MAX_DELAY: float = 10.0  # 单次重试的最长等待时间（秒）
+    TOOL_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败多少次后熔断工具
+    TOOL_BREAKER_RECOVERY_TIMEOUT: float = 30.0  # 熔断后多久放行探测调用（秒）
+    
+    # 执行结果存储配置（按序列化后的字节数计算）
+    RESULT_STORE_MAX_BYTES: int = 64 * 1024 * 1024  # 每个执行代理内存中保留的结果总大小
+    RESULT_STORE_SPILL_THRESHOLD: int = 1024 * 1024  # 不小于该大小的结果写入磁盘，0 表示不落盘
+    RESULT_STORE_SPILL_DIR: str = "./data/results"
+    RESULT_STORE_MAX_DISK_BYTES: int = 1024 * 1024 * 1024  # 每个执行代理落盘结果的总大小
+    
+    # 任务存储配置
+    TASK_STORE_MAX_TASKS: int = 10000  # 内存中最多保留的任务数
+    TASK_STORE_TTL: int = 3600  # 已结束任务的闲置淘汰时间（秒）
+    STATUS_RECENT_TASKS: int = 100  # /status 返回的最近任务数
+    TASK_BATCH_MAX_SIZE: int = 5000  # 单次批量提交/查询的最大任务数
+    
+    # 结果缓存配置
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTLS: Dict[str, int] = {  # 按任务类型的缓存时间（秒），0 表示不缓存
+        "data_processing": 600
+    }
+    RESULT_CACHE_DEFAULT_TTL: int = 0
+    RESULT_CACHE_OPT_IN_TTL: int = 300  # 未配置缓存时间的任务在 metadata.cache 为真时的缓存时间（秒）
+    RESULT_CACHE_MAX_LOCAL_ENTRIES: int = 1000
+    
+    # 执行模式配置
+    EXECUTION_MODE: str = "local"  # local: API进程内执行；distributed: 由独立执行进程消费共享队列
+    WORKER_PROCESSES: int = 2  # 执行进程数，每个进程并发执行 MAX_WORKERS 个任务
+    SHARED_QUEUE_BACKEND: str = "sqlite"  # redis 或 sqlite（单机多进程）
+    SHARED_QUEUE_PATH: str = "./data/task_queue.db"
+    SHARED_QUEUE_POLL_INTERVAL: float = 0.2  # 状态轮询间隔（秒）
+    SHARED_QUEUE_STATE_TTL: int = 86400  # 共享任务状态保留时间（秒）
+    SHARED_QUEUE_LEASE_TIMEOUT: int = 60  # 执行进程取出任务的租约时间（秒），执行中定期续约，到期未确认的任务重新入队
+    
+    # 检查点配置（计划步骤完成后保存输出，重启后从已完成步骤继续执行）
+    CHECKPOINT_ENABLED: bool = True
+    CHECKPOINT_DIR: str = "./data/checkpoints"
+    CHECKPOINT_RESUME: bool = True  # 启动时恢复未完成的任务
+    
+    # 任务进度推送配置（WebSocket/SSE）
+    STREAM_BUFFER_SIZE: int = 100  # 每个连接缓冲的事件数，超出时丢弃最旧的事件
+    STREAM_KEEPALIVE_INTERVAL: float = 15.0  # 无事件时发送心跳的间隔（秒）
+    
+    # 监督代理配置
+    SUPERVISOR_QUEUE_SIZE: int = 10000  # 事件队列容量，满时丢弃新事件
+    SUPERVISOR_CHECK_INTERVAL: int = 30  # 代理停滞检查间隔（秒）
+    SUPERVISOR_MAX_ALERTS: int = 1000
     
     class Config:
         case_sensitive = True
@@ -1,4 +1,5 @@
-from typing import Dict, List, Callable, Any, Awaitable
+from typing import Dict, List, Callable, Any, Awaitable, Deque
+from collections import deque
 import asyncio
 import logging
 from datetime import datetime
@@ -20,8 +21,8 @@ class EventBus:
     def initialize(self):
         """初始化事件总线"""
         self.subscribers: Dict[str, List[Callable[..., Awaitable[None]]]] = {}
-        self.event_history: List[Dict[str, Any]] = []
         self.max_history = 1000
+        self.event_history: Deque[Dict[str, Any]] = deque(maxlen=self.max_history)
         logger.info("Event bus initialized")
 
     async def publish(self, event_type: str, data: Any = None) -> None:
@@ -33,11 +34,9 @@ class EventBus:
                 "data": data,
                 "timestamp": datetime.now().isoformat()
             }
-            self.event_history.append(event)
-            
-            # 维护历史记录大小
-            if len(self.event_history) > self.max_history:
-                self.event_history = self.event_history[-self.max_history:]
+            # 流式输出分块只推送给订阅者，不占用事件历史
+            if event_type not in EventTypes.STREAMING:
+                self.event_history.append(event)
             
             # 通知订阅者
             if event_type in self.subscribers:
@@ -76,7 +75,7 @@ class EventBus:
     def get_history(self, event_type: str = None, limit: int = None) -> List[Dict[str, Any]]:
         """获取事件历史"""
         try:
-            history = self.event_history
+            history = list(self.event_history)
             if event_type:
                 history = [e for e in history if e["type"] == event_type]
             if limit:
@@ -89,7 +88,7 @@ class EventBus:
     def clear_history(self) -> None:
         """清除事件历史"""
         try:
-            self.event_history = []
+            self.event_history.clear()
             logger.debug("Event history cleared")
         except Exception as e:
             logger.error(f"Failed to clear event history: {str(e)}")
@@ -101,17 +100,28 @@ class EventTypes:
     TASK_STARTED = "task.started"
     TASK_COMPLETED = "task.completed"
     TASK_FAILED = "task.failed"
+    TASK_CANCELLED = "task.cancelled"
+    TASK_STEP_COMPLETED = "task.step_completed"
     
     # 代理相关事件
     AGENT_INITIALIZED = "agent.initialized"
     AGENT_STARTED = "agent.started"
     AGENT_STOPPED = "agent.stopped"
     AGENT_ERROR = "agent.error"
+    AGENT_STATE_CHANGED = "agent.state_changed"
     
     # 工具相关事件
     TOOL_STARTED = "tool.started"
     TOOL_COMPLETED = "tool.completed"
     TOOL_FAILED = "tool.failed"
+    TOOL_OUTPUT = "tool.output"
+
+    # 代码执行相关事件
+    CODE_OUTPUT = "code.output"
+    CODE_FINISHED = "code.finished"
+
+    # 流式输出分块事件，不记录到事件历史
+    STREAMING = frozenset({TOOL_OUTPUT, CODE_OUTPUT})
     
     # 系统相关事件
     SYSTEM_STARTED = "system.started"
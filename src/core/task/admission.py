@@ -0,0 +1,96 @@
+from typing import Dict, Any, Optional
+import logging
+import math
+import psutil
+
+from src.common.config.settings import settings
+from src.models.task import TaskPriority
+
+logger = logging.getLogger(__name__)
+
+class AdmissionDecision:
+    """准入判定结果"""
+
+    def __init__(self, admitted: bool, reason: Optional[str] = None, retry_after: int = 0):
+        self.admitted = admitted
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """任务准入控制
+
+    根据队列深度、在途任务数和进程内存占用决定是否接收新任务。
+    不同优先级使用不同比例的阈值，负载升高时优先拒绝低优先级任务，
+    URGENT 任务只在达到硬上限时才被拒绝。
+    """
+
+    # 各优先级可使用的容量比例
+    SHED_FACTORS: Dict[str, float] = {
+        TaskPriority.LOW.value: 0.5,
+        TaskPriority.MEDIUM.value: 0.75,
+        TaskPriority.HIGH.value: 0.9,
+        TaskPriority.URGENT.value: 1.0
+    }
+
+    def __init__(self, max_pending: Optional[int] = None, memory_limit_mb: Optional[float] = None,
+                 max_retry_after: Optional[int] = None):
+        self.max_pending = max_pending or settings.ADMISSION_MAX_PENDING
+        self.memory_limit_mb = memory_limit_mb or settings.MAX_MEMORY
+        self.max_retry_after = max_retry_after or settings.ADMISSION_MAX_RETRY_AFTER
+        self.avg_duration = 1.0
+        self.rejected: Dict[str, int] = {priority: 0 for priority in self.SHED_FACTORS}
+        self._process = psutil.Process()
+
+    def check(self, queue_depth: int, in_flight: int, workers: int,
+              priority: str = TaskPriority.MEDIUM.value, count: int = 1) -> AdmissionDecision:
+        """判定是否接收 count 个指定优先级的新任务"""
+        factor = self.SHED_FACTORS.get(priority, self.SHED_FACTORS[TaskPriority.MEDIUM.value])
+        workers = max(workers, 1)
+
+        pending = queue_depth + in_flight
+        if pending + count > self.max_pending * factor:
+            backlog = pending + count - self.max_pending * factor
+            return self._reject(
+                priority,
+                f"Task queue is full ({pending} pending) for {priority} priority tasks",
+                backlog * self.avg_duration / workers
+            )
+
+        memory_mb = self.memory_usage_mb()
+        if memory_mb > self.memory_limit_mb * factor:
+            return self._reject(
+                priority,
+                f"Memory usage {memory_mb:.0f}MB exceeds limit for {priority} priority tasks",
+                self.avg_duration * max(in_flight, 1) / workers
+            )
+
+        return AdmissionDecision(True)
+
+    def record_duration(self, seconds: float) -> None:
+        """记录任务执行时间（指数移动平均），用于估算 Retry-After"""
+        self.avg_duration = 0.9 * self.avg_duration + 0.1 * max(seconds, 0.0)
+
+    def memory_usage_mb(self) -> float:
+        """当前进程常驻内存（MB）"""
+        try:
+            return self._process.memory_info().rss / (1024 * 1024)
+        except Exception as e:
+            logger.error(f"Failed to read process memory: {str(e)}")
+            return 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """准入控制状态"""
+        return {
+            "max_pending": self.max_pending,
+            "memory_limit_mb": self.memory_limit_mb,
+            "memory_usage_mb": round(self.memory_usage_mb(), 1),
+            "avg_duration": round(self.avg_duration, 3),
+            "rejected": dict(self.rejected)
+        }
+
+    def _reject(self, priority: str, reason: str, wait_seconds: float) -> AdmissionDecision:
+        """生成拒绝结果"""
+        self.rejected[priority] = self.rejected.get(priority, 0) + 1
+        retry_after = min(max(int(math.ceil(wait_seconds)), 1), self.max_retry_after)
+        logger.warning(f"Task rejected: {reason}, retry after {retry_after}s")
+        return AdmissionDecision(False, reason, retry_after)
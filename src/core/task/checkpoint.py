@@ -0,0 +1,182 @@
+from typing import Dict, Any, List, Optional, IO
+from pathlib import Path
+import fcntl
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+
+from src.common.config.settings import settings
+from src.storage.database.manager import DatabaseManager
+from src.storage.database.models import ExecutionLog
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_CHARS = re.compile(r"[^\w.-]")
+
+class CheckpointStore:
+    """任务检查点存储
+
+    任务提交、步骤完成和任务结束分别记录为一条 ExecutionLog，
+    步骤输出序列化后写入 blob 目录，日志中只保存文件路径。
+    服务重启后，没有结束记录的任务从已完成的步骤继续执行。
+
+    每个控制器运行期间持有 owners 目录下以 agent_id 命名的文件锁，提交记录中的 agent_id 即任务归属。
+    恢复时只接管锁已释放（进程已退出）的控制器的任务，并在一条 UPDATE 中把归属改为自己，
+    多个进程同时启动时每个任务只会被一个进程接管。
+    """
+
+    TASK_SUBMITTED = "task_submitted"
+    STEP_COMPLETED = "step_completed"
+    TASK_FINISHED = "task_finished"
+
+    def __init__(self, blob_dir: Optional[str] = None, db_manager: Optional[DatabaseManager] = None):
+        self.blob_dir = Path(blob_dir or settings.CHECKPOINT_DIR)
+        self.db_manager = db_manager or DatabaseManager()
+        self.owner_dir = self.blob_dir / ".owners"
+        self._owner_lock: Optional[IO[bytes]] = None
+
+    def register_owner(self, agent_id: str) -> None:
+        """持有本控制器的归属锁直到 release_owner 或进程退出"""
+        self.owner_dir.mkdir(parents=True, exist_ok=True)
+        self._owner_lock = open(self._owner_path(agent_id), "ab")
+        fcntl.flock(self._owner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def release_owner(self) -> None:
+        """释放归属锁，未结束的任务可被其他进程接管"""
+        if self._owner_lock is not None:
+            self._owner_lock.close()
+            self._owner_lock = None
+
+    def record_tasks(self, agent_id: str, tasks: List[Dict[str, Any]]) -> None:
+        """在一个事务中记录提交的任务"""
+        with self.db_manager.get_session() as session:
+            session.add_all([
+                ExecutionLog(
+                    task_id=task["task_id"],
+                    agent_id=agent_id,
+                    action=self.TASK_SUBMITTED,
+                    result=self._to_json(task)
+                )
+                for task in tasks
+            ])
+            session.commit()
+
+    def record_step(self, task_id: str, agent_id: str, step_id: str, output: Dict[str, Any]) -> None:
+        """保存已完成步骤的输出"""
+        path = self._blob_path(task_id, step_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免进程中断留下不完整的输出
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        with self.db_manager.get_session() as session:
+            session.add(ExecutionLog(
+                task_id=task_id,
+                agent_id=agent_id,
+                action=self.STEP_COMPLETED,
+                result={"step_id": step_id, "blob": str(path)}
+            ))
+            session.commit()
+
+    def load_steps(self, task_id: str) -> Dict[str, Dict[str, Any]]:
+        """读取任务已完成步骤的输出，blob 缺失的步骤视为未完成"""
+        with self.db_manager.get_session() as session:
+            logs = session.query(ExecutionLog).filter(
+                ExecutionLog.task_id == task_id,
+                ExecutionLog.action == self.STEP_COMPLETED
+            ).all()
+            records = [log.result or {} for log in logs]
+
+        outputs = {}
+        for record in records:
+            try:
+                with open(record["blob"], "rb") as f:
+                    outputs[record["step_id"]] = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring checkpoint of step {record.get('step_id')} for task {task_id}: {str(e)}")
+        return outputs
+
+    def finish_task(self, task_id: str, agent_id: str, status: str) -> None:
+        """记录任务结束并删除步骤输出"""
+        with self.db_manager.get_session() as session:
+            session.add(ExecutionLog(
+                task_id=task_id,
+                agent_id=agent_id,
+                action=self.TASK_FINISHED,
+                result={"status": status}
+            ))
+            session.commit()
+        shutil.rmtree(self.blob_dir / task_id, ignore_errors=True)
+
+    def claim_unfinished(self, agent_id: str) -> List[Dict[str, Any]]:
+        """接管已退出的控制器未结束的任务，按提交顺序返回接管到的任务"""
+        by_owner: Dict[str, List[ExecutionLog]] = {}
+        for log in self._unfinished_logs():
+            if log.agent_id != agent_id and log.result:
+                by_owner.setdefault(log.agent_id, []).append(log)
+
+        claimed = []
+        for owner, logs in by_owner.items():
+            lock = self._lock_dead_owner(owner)
+            if lock is None:
+                continue
+            try:
+                with self.db_manager.get_session() as session:
+                    # 同时接管同一控制器的其他进程在这里只会更新 0 行
+                    updated = session.query(ExecutionLog).filter(
+                        ExecutionLog.action == self.TASK_SUBMITTED,
+                        ExecutionLog.agent_id == owner,
+                        ExecutionLog.id.in_([log.id for log in logs])
+                    ).update({ExecutionLog.agent_id: agent_id}, synchronize_session=False)
+                    session.commit()
+                if updated:
+                    claimed.extend(logs)
+                    logger.info(f"Claimed {updated} unfinished tasks of {owner}")
+            finally:
+                self._owner_path(owner).unlink(missing_ok=True)
+                lock.close()
+
+        claimed.sort(key=lambda log: log.id)
+        return [log.result for log in claimed]
+
+    def _unfinished_logs(self) -> List[ExecutionLog]:
+        """没有结束记录的任务提交记录，按提交顺序返回"""
+        with self.db_manager.get_session() as session:
+            finished = session.query(ExecutionLog.task_id).filter(
+                ExecutionLog.action == self.TASK_FINISHED
+            )
+            logs = session.query(ExecutionLog).filter(
+                ExecutionLog.action == self.TASK_SUBMITTED,
+                ~ExecutionLog.task_id.in_(finished)
+            ).order_by(ExecutionLog.id).all()
+            session.expunge_all()
+            return logs
+
+    def _lock_dead_owner(self, owner: str) -> Optional[IO[bytes]]:
+        """获取已退出控制器的归属锁，控制器仍在运行时返回 None"""
+        self.owner_dir.mkdir(parents=True, exist_ok=True)
+        lock = open(self._owner_path(owner), "ab")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _owner_path(self, agent_id: str) -> Path:
+        """控制器归属锁文件路径"""
+        return self.owner_dir / (_UNSAFE_CHARS.sub("_", agent_id) + ".lock")
+
+    def _blob_path(self, task_id: str, step_id: str) -> Path:
+        """步骤输出文件路径"""
+        return self.blob_dir / task_id / (_UNSAFE_CHARS.sub("_", step_id) + ".pkl")
+
+    @staticmethod
+    def _to_json(value: Any) -> Any:
+        """转换为可写入 JSON 列的值"""
+        return json.loads(json.dumps(value, default=str))
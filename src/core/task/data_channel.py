@@ -0,0 +1,38 @@
+from typing import Dict, Any, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DataChannel:
+    """计划步骤之间按引用传递数据的内存通道
+
+    上游步骤放入的对象（如 DataFrame）直接交给下游步骤，不经过序列化；
+    每个值在所有下游步骤取用后释放，没有下游步骤的值不保存。
+    """
+
+    def __init__(self, steps: Iterable[Dict[str, Any]] = ()):
+        self._consumers: Dict[str, int] = {}
+        for step in steps:
+            for dep in step.get("depends_on", []):
+                self._consumers[dep] = self._consumers.get(dep, 0) + 1
+        self._values: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def put(self, step_id: str, value: Any) -> None:
+        """保存步骤产出的对象，重试时覆盖之前的值"""
+        if self._consumers.get(step_id):
+            self._values[step_id] = value
+
+    def take(self, step_ids: Iterable[str]) -> Dict[str, Any]:
+        """取出上游步骤的对象，按 step_ids 顺序返回；不存在的步骤（例如从检查点恢复）不包含在内"""
+        values = {}
+        for step_id in step_ids:
+            if step_id not in self._values:
+                continue
+            values[step_id] = self._values[step_id]
+            self._consumers[step_id] -= 1
+            if self._consumers[step_id] <= 0:
+                del self._values[step_id]
+        return values
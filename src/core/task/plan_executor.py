@@ -0,0 +1,119 @@
+from typing import Dict, Any, List, Callable, Awaitable, Set, Optional
+import asyncio
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+StepRunner = Callable[[Dict[str, Any], Dict[str, Any], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+StepCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+class PlanExecutor:
+    """执行计划调度器：按步骤依赖关系构建DAG，并发执行互不依赖的步骤"""
+
+    def __init__(self, step_runner: StepRunner):
+        self.step_runner = step_runner
+
+    def build_graph(self, steps: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """构建依赖图并校验未知依赖和循环依赖"""
+        graph: Dict[str, Dict[str, Any]] = {}
+        for index, step in enumerate(steps):
+            step_id = step.get("id") or step.get("action") or f"step_{index}"
+            if step_id in graph:
+                raise ValueError(f"Duplicate step id: {step_id}")
+            graph[step_id] = {**step, "id": step_id, "depends_on": list(step.get("depends_on", []))}
+
+        for step_id, step in graph.items():
+            unknown = [dep for dep in step["depends_on"] if dep not in graph]
+            if unknown:
+                raise ValueError(f"Step {step_id} depends on unknown steps: {', '.join(unknown)}")
+
+        # 拓扑排序检测循环依赖
+        indegree = {step_id: len(step["depends_on"]) for step_id, step in graph.items()}
+        ready = [step_id for step_id, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for step_id, step in graph.items():
+                if current in step["depends_on"]:
+                    indegree[step_id] -= 1
+                    if indegree[step_id] == 0:
+                        ready.append(step_id)
+        if visited != len(graph):
+            raise ValueError("Plan contains circular dependencies")
+
+        return graph
+
+    async def execute(self, plan: Dict[str, Any], task: Dict[str, Any],
+                      completed: Optional[Dict[str, Dict[str, Any]]] = None,
+                      on_step_finished: Optional[StepCallback] = None) -> Dict[str, Any]:
+        """执行计划，依赖满足的步骤立即启动，上游输出作为下游输入
+
+        completed 为检查点中已完成步骤的输出，这些步骤不再执行；
+        每个步骤执行结束后调用 on_step_finished（用于保存检查点和推送进度）。
+        """
+        graph = self.build_graph(plan.get("steps", []))
+        outputs: Dict[str, Dict[str, Any]] = {
+            step_id: output for step_id, output in (completed or {}).items() if step_id in graph
+        }
+        remaining: Dict[str, Set[str]] = {
+            step_id: set(step["depends_on"]) for step_id, step in graph.items() if step_id not in outputs
+        }
+        running: Dict[asyncio.Task, str] = {}
+
+        try:
+            while remaining or running:
+                self._launch_ready(graph, remaining, outputs, running, task)
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    step_id = running.pop(finished)
+                    outputs[step_id] = finished.result()
+                    if on_step_finished:
+                        await on_step_finished(step_id, outputs[step_id])
+        finally:
+            for pending in running:
+                pending.cancel()
+
+        return {
+            "status": "completed",
+            "results": [outputs[step_id] for step_id in graph],
+            "steps": {step_id: outputs[step_id].get("status") for step_id in graph},
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _launch_ready(self, graph: Dict[str, Dict[str, Any]], remaining: Dict[str, Set[str]],
+                      outputs: Dict[str, Dict[str, Any]], running: Dict[asyncio.Task, str],
+                      task: Dict[str, Any]) -> None:
+        """启动所有依赖已完成的步骤，上游失败的步骤直接跳过"""
+        progressed = True
+        while progressed:
+            progressed = False
+            for step_id in [s for s, deps in remaining.items() if deps <= outputs.keys()]:
+                deps = remaining.pop(step_id)
+                progressed = True
+                failed = [dep for dep in deps if outputs[dep].get("status") != "completed"]
+                if failed:
+                    outputs[step_id] = {
+                        "status": "skipped",
+                        "error": f"Dependency failed: {', '.join(sorted(failed))}"
+                    }
+                    continue
+
+                inputs = {dep: outputs[dep] for dep in graph[step_id]["depends_on"]}
+                runner = asyncio.create_task(self._run_step(graph[step_id], task, inputs))
+                running[runner] = step_id
+
+    async def _run_step(self, step: Dict[str, Any], task: Dict[str, Any],
+                        inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单个步骤，异常转为错误结果"""
+        try:
+            return await self.step_runner(step, task, inputs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Step {step['id']} failed: {str(e)}")
+            return {"status": "error", "error": str(e)}
@@ -0,0 +1,96 @@
+from typing import Dict, Any, List, Optional, Deque, Tuple
+from collections import deque
+import asyncio
+import logging
+import time
+
+from src.common.config.settings import settings
+from src.models.task import TaskPriority
+
+logger = logging.getLogger(__name__)
+
+# 优先级从低到高
+PRIORITY_LEVELS: List[str] = [
+    TaskPriority.LOW.value,
+    TaskPriority.MEDIUM.value,
+    TaskPriority.HIGH.value,
+    TaskPriority.URGENT.value
+]
+
+class PriorityScheduler:
+    """多级优先级调度队列
+
+    每个优先级一个FIFO队列。出队时比较各队首的有效优先级：
+    基础级别 + 等待时间 / aging_interval，等待越久有效优先级越高，
+    避免低优先级任务饿死。
+    """
+
+    def __init__(self, aging_interval: Optional[float] = None, wait_samples: int = 1000):
+        self.aging_interval = aging_interval or settings.SCHEDULER_AGING_INTERVAL
+        self.levels: Dict[str, Deque[Tuple[float, Any]]] = {
+            priority: deque() for priority in PRIORITY_LEVELS
+        }
+        self._not_empty = asyncio.Event()
+        self._wait_samples: Dict[str, Deque[float]] = {
+            priority: deque(maxlen=wait_samples) for priority in PRIORITY_LEVELS
+        }
+        self._dispatched: Dict[str, int] = {priority: 0 for priority in PRIORITY_LEVELS}
+
+    def put_nowait(self, item: Any, priority: str = TaskPriority.MEDIUM.value) -> None:
+        """按优先级入队，未知优先级按 medium 处理"""
+        if priority not in self.levels:
+            priority = TaskPriority.MEDIUM.value
+        self.levels[priority].append((time.monotonic(), item))
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        """取出有效优先级最高的任务，队列为空时等待"""
+        while True:
+            item = self.get_nowait()
+            if item is not None:
+                return item
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+    def get_nowait(self) -> Optional[Any]:
+        """取出有效优先级最高的任务，队列为空时返回 None"""
+        now = time.monotonic()
+        best_priority = None
+        best_score = None
+        for rank, priority in enumerate(PRIORITY_LEVELS):
+            queue = self.levels[priority]
+            if not queue:
+                continue
+            score = rank + (now - queue[0][0]) / self.aging_interval
+            # 分数相同时高优先级优先
+            if best_score is None or score >= best_score:
+                best_priority, best_score = priority, score
+
+        if best_priority is None:
+            return None
+
+        enqueued_at, item = self.levels[best_priority].popleft()
+        self._wait_samples[best_priority].append(now - enqueued_at)
+        self._dispatched[best_priority] += 1
+        return item
+
+    def qsize(self) -> int:
+        """等待中的任务总数"""
+        return sum(len(queue) for queue in self.levels.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各优先级的排队数及排队等待时间（秒）"""
+        now = time.monotonic()
+        result = {}
+        for priority in PRIORITY_LEVELS:
+            samples = sorted(self._wait_samples[priority])
+            queue = self.levels[priority]
+            result[priority] = {
+                "queued": len(queue),
+                "dispatched": self._dispatched[priority],
+                "oldest_wait": round(now - queue[0][0], 3) if queue else 0.0,
+                "avg_wait": round(sum(samples) / len(samples), 3) if samples else 0.0,
+                "p95_wait": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else 0.0,
+                "max_wait": round(samples[-1], 3) if samples else 0.0
+            }
+        return result
@@ -0,0 +1,428 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from src.common.config.settings import settings
+from src.models.task import TaskPriority
+from src.storage.cache.manager import CacheManager
+from .scheduler import PRIORITY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+# 已结束的任务状态，重新投递的任务遇到这些状态时不再执行
+TERMINAL_STATUSES = ("completed", "error", "cancelled", "timeout")
+
+def order_key(priority: str, enqueued_at: float) -> float:
+    """出队排序键，越小越先出队
+
+    与 PriorityScheduler 的有效优先级 rank + 等待时间 / aging_interval 顺序一致，
+    等待越久越靠前，低优先级任务不会饿死。
+    """
+    rank = PRIORITY_LEVELS.index(priority) if priority in PRIORITY_LEVELS else 1
+    return enqueued_at - rank * settings.SCHEDULER_AGING_INTERVAL
+
+class SharedTaskQueue(ABC):
+    """跨进程共享的任务队列及任务状态存储
+
+    API进程只负责入队和读取状态，执行进程从队列中取出任务执行并写回状态。
+    取出的任务进入租约状态，执行进程定期续约，结束后确认删除；
+    租约到期未确认（执行进程退出）的任务重新入队，保证至少执行一次。
+    """
+
+    @abstractmethod
+    async def initialize(self) -> None:
+        """初始化后端连接"""
+        pass
+
+    @abstractmethod
+    async def cleanup(self) -> None:
+        """清理后端连接"""
+        pass
+
+    @abstractmethod
+    async def push(self, tasks: List[Dict[str, Any]]) -> None:
+        """批量入队"""
+        pass
+
+    @abstractmethod
+    async def pop(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """租用有效优先级最高的任务，超时返回 None"""
+        pass
+
+    @abstractmethod
+    async def renew(self, task_ids: List[str]) -> None:
+        """延长任务的租约"""
+        pass
+
+    @abstractmethod
+    async def ack(self, task_id: str) -> None:
+        """确认任务已处理，从队列中删除"""
+        pass
+
+    @abstractmethod
+    async def qsize(self) -> int:
+        """排队中的任务数"""
+        pass
+
+    @abstractmethod
+    async def set_state(self, task_id: str, state: Dict[str, Any]) -> None:
+        """写入任务状态"""
+        pass
+
+    @abstractmethod
+    async def claim(self, task_id: str, state: Dict[str, Any]) -> bool:
+        """任务未被取消或结束时原子地写入运行状态，否则不写入并返回 False"""
+        pass
+
+    @abstractmethod
+    async def get_states(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取任务状态，不存在的任务不出现在结果中"""
+        pass
+
+class RedisTaskQueue(SharedTaskQueue):
+    """基于 Redis 的共享队列
+
+    排队任务保存在按排序键排序的有序集合中，租用中的任务保存在按租约到期时间排序的有序集合中，
+    任务内容和排序键保存在哈希表中。
+    """
+
+    QUEUE_KEY = "task_queue"
+    LEASE_KEY = "task_queue:leases"
+    PAYLOAD_KEY = "task_queue:payloads"
+    ORDER_KEY = "task_queue:order"
+    STATE_PREFIX = "task_state:"
+    # 先把租约到期的任务按原排序键放回队列，再取出队首任务并写入租约
+    POP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, task_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], task_id)
+    redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[4], task_id) or ARGV[1], task_id)
+end
+local head = redis.call('ZRANGE', KEYS[1], 0, 0)
+if #head == 0 then
+    return false
+end
+redis.call('ZREM', KEYS[1], head[1])
+redis.call('ZADD', KEYS[2], ARGV[2], head[1])
+return redis.call('HGET', KEYS[3], head[1])
+"""
+    # 读取状态、判断是否已取消或结束和写入在一个脚本中执行，不会与取消操作交错
+    CLAIM_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local status = cjson.decode(current)['status']
+    if status == 'completed' or status == 'error' or status == 'cancelled' or status == 'timeout' then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+    def __init__(self, cache_manager: Optional[CacheManager] = None):
+        self.cache_manager = cache_manager or CacheManager()
+        self.poll_interval = settings.SHARED_QUEUE_POLL_INTERVAL
+        self.lease_timeout = settings.SHARED_QUEUE_LEASE_TIMEOUT
+
+    async def initialize(self) -> None:
+        await self.cache_manager.initialize()
+
+    async def cleanup(self) -> None:
+        await self.cache_manager.cleanup()
+
+    async def push(self, tasks: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        async with self.cache_manager.redis.pipeline(transaction=True) as pipe:
+            for task in tasks:
+                task_id = task["task_id"]
+                key = order_key(task.get("priority", TaskPriority.MEDIUM.value), now)
+                pipe.hset(self.PAYLOAD_KEY, task_id, json.dumps(task, default=str))
+                pipe.hset(self.ORDER_KEY, task_id, key)
+                pipe.zadd(self.QUEUE_KEY, {task_id: key})
+            await pipe.execute()
+
+    async def pop(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.time()
+            payload = await self.cache_manager.redis.eval(
+                self.POP_SCRIPT, 4,
+                self.QUEUE_KEY, self.LEASE_KEY, self.PAYLOAD_KEY, self.ORDER_KEY,
+                now, now + self.lease_timeout
+            )
+            if payload:
+                return json.loads(payload)
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    async def renew(self, task_ids: List[str]) -> None:
+        if not task_ids:
+            return
+        lease_until = time.time() + self.lease_timeout
+        # XX：只更新仍在租用中的任务
+        await self.cache_manager.redis.zadd(
+            self.LEASE_KEY, {task_id: lease_until for task_id in task_ids}, xx=True
+        )
+
+    async def ack(self, task_id: str) -> None:
+        async with self.cache_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.LEASE_KEY, task_id)
+            pipe.zrem(self.QUEUE_KEY, task_id)
+            pipe.hdel(self.PAYLOAD_KEY, task_id)
+            pipe.hdel(self.ORDER_KEY, task_id)
+            await pipe.execute()
+
+    async def qsize(self) -> int:
+        return await self.cache_manager.redis.zcard(self.QUEUE_KEY)
+
+    async def set_state(self, task_id: str, state: Dict[str, Any]) -> None:
+        await self.cache_manager.set(
+            self.STATE_PREFIX + task_id,
+            json.loads(json.dumps(state, default=str)),
+            expire=settings.SHARED_QUEUE_STATE_TTL
+        )
+
+    async def claim(self, task_id: str, state: Dict[str, Any]) -> bool:
+        claimed = await self.cache_manager.redis.eval(
+            self.CLAIM_SCRIPT, 1, self.STATE_PREFIX + task_id,
+            json.dumps(state, default=str), settings.SHARED_QUEUE_STATE_TTL
+        )
+        return bool(claimed)
+
+    async def get_states(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        values = await self.cache_manager.get_many([self.STATE_PREFIX + t for t in task_ids])
+        return {
+            task_id: value
+            for task_id, value in zip(task_ids, values)
+            if isinstance(value, dict)
+        }
+
+class SQLiteTaskQueue(SharedTaskQueue):
+    """基于本地 SQLite 文件的共享队列，适用于单机多进程部署"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.SHARED_QUEUE_PATH)
+        self.poll_interval = settings.SHARED_QUEUE_POLL_INTERVAL
+        self.lease_timeout = settings.SHARED_QUEUE_LEASE_TIMEOUT
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    async def initialize(self) -> None:
+        await asyncio.to_thread(self._connect)
+
+    async def cleanup(self) -> None:
+        if self._conn:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> None:
+        """打开数据库并建表"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "task_id TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "enqueued_at REAL NOT NULL, "
+                "order_key REAL, "
+                "lease_until REAL)"
+            )
+            self._upgrade_queue()
+            self._conn.execute("DROP INDEX IF EXISTS ix_task_queue_order")
+            # 排队中的任务 lease_until 为 NULL，按排序键出队
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_task_queue_pending ON task_queue (lease_until, order_key, id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_task_queue_task_id ON task_queue (task_id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_states ("
+                "task_id TEXT PRIMARY KEY, "
+                "state TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._purge_states()
+
+    def _upgrade_queue(self) -> None:
+        """为旧版本创建的队列表补充排序键和租约列（调用方持有锁）"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(task_queue)")}
+        if "order_key" not in columns:
+            self._conn.execute("ALTER TABLE task_queue ADD COLUMN order_key REAL")
+            self._conn.execute("ALTER TABLE task_queue ADD COLUMN lease_until REAL")
+            self._conn.execute(
+                "UPDATE task_queue SET order_key = enqueued_at - priority * ?",
+                (settings.SCHEDULER_AGING_INTERVAL,)
+            )
+
+    async def push(self, tasks: List[Dict[str, Any]]) -> None:
+        rows = []
+        now = time.time()
+        for task in tasks:
+            priority = task.get("priority", TaskPriority.MEDIUM.value)
+            rank = PRIORITY_LEVELS.index(priority) if priority in PRIORITY_LEVELS else 1
+            rows.append((task["task_id"], rank, json.dumps(task, default=str), now, order_key(priority, now)))
+        await asyncio.to_thread(self._push, rows)
+
+    def _push(self, rows: List[tuple]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO task_queue (task_id, priority, payload, enqueued_at, order_key) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def pop(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            payload = await asyncio.to_thread(self._pop)
+            if payload is not None:
+                return json.loads(payload)
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    def _pop(self) -> Optional[str]:
+        """在写事务中租用队首任务，保证只被一个进程取到；租约到期的任务先放回队列"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE task_queue SET lease_until = NULL WHERE lease_until < ?", (now,)
+                )
+                row = self._conn.execute(
+                    "SELECT id, payload FROM task_queue WHERE lease_until IS NULL "
+                    "ORDER BY order_key, id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE task_queue SET lease_until = ? WHERE id = ?",
+                        (now + self.lease_timeout, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[1] if row else None
+
+    async def renew(self, task_ids: List[str]) -> None:
+        if task_ids:
+            await asyncio.to_thread(self._renew, task_ids)
+
+    def _renew(self, task_ids: List[str]) -> None:
+        lease_until = time.time() + self.lease_timeout
+        with self._lock:
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"UPDATE task_queue SET lease_until = ? "
+                    f"WHERE lease_until IS NOT NULL AND task_id IN ({placeholders})",
+                    [lease_until, *chunk]
+                )
+
+    async def ack(self, task_id: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM task_queue WHERE task_id = ?", (task_id,))
+
+    def _execute(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    async def qsize(self) -> int:
+        return await asyncio.to_thread(
+            self._query_one, "SELECT COUNT(*) FROM task_queue WHERE lease_until IS NULL"
+        )
+
+    def _query_one(self, sql: str) -> Any:
+        with self._lock:
+            return self._conn.execute(sql).fetchone()[0]
+
+    async def set_state(self, task_id: str, state: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._set_state, task_id, json.dumps(state, default=str))
+
+    def _set_state(self, task_id: str, state: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_states (task_id, state, updated_at) VALUES (?, ?, ?)",
+                (task_id, state, time.time())
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._purge_states()
+
+    async def claim(self, task_id: str, state: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self._claim, task_id, json.dumps(state, default=str))
+
+    def _claim(self, task_id: str, state: str) -> bool:
+        """在写事务中检查并写入状态，其他进程的取消只能发生在事务之前或之后"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state FROM task_states WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                claimed = row is None or json.loads(row[0]).get("status") not in TERMINAL_STATUSES
+                if claimed:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO task_states (task_id, state, updated_at) VALUES (?, ?, ?)",
+                        (task_id, state, time.time())
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _purge_states(self) -> None:
+        """清理过期的任务状态（调用方持有锁）"""
+        self._conn.execute(
+            "DELETE FROM task_states WHERE updated_at < ?",
+            (time.time() - settings.SHARED_QUEUE_STATE_TTL,)
+        )
+
+    async def get_states(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not task_ids:
+            return {}
+        return await asyncio.to_thread(self._get_states, task_ids)
+
+    def _get_states(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        states = {}
+        with self._lock:
+            # 分批查询，避免超过 SQLite 参数数量上限
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT task_id, state FROM task_states WHERE task_id IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for task_id, state in rows:
+                    states[task_id] = json.loads(state)
+        return states
+
+def create_shared_queue() -> SharedTaskQueue:
+    """根据配置创建共享队列"""
+    if settings.SHARED_QUEUE_BACKEND == "redis":
+        return RedisTaskQueue()
+    return SQLiteTaskQueue()
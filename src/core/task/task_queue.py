@@ -0,0 +1,69 @@
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+import asyncio
+import logging
+
+from src.common.config.settings import settings
+from src.models.task import TaskPriority
+from .scheduler import PriorityScheduler
+
+logger = logging.getLogger(__name__)
+
+class TaskQueue:
+    """异步优先级任务队列，由固定数量的工作协程消费"""
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]],
+                 max_workers: Optional[int] = None):
+        self.handler = handler
+        self.max_workers = max_workers or settings.MAX_WORKERS
+        self.scheduler = PriorityScheduler()
+        self.workers: List[asyncio.Task] = []
+        self.in_flight = 0
+
+    async def start(self) -> None:
+        """启动工作协程"""
+        if self.workers:
+            return
+        self.workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.max_workers)
+        ]
+        logger.info(f"Task queue started with {self.max_workers} workers")
+
+    async def stop(self) -> None:
+        """停止工作协程"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info("Task queue stopped")
+
+    async def put(self, task_id: str, priority: str = TaskPriority.MEDIUM.value) -> None:
+        """任务按优先级入队"""
+        self.scheduler.put_nowait(task_id, priority)
+
+    def qsize(self) -> int:
+        """队列中等待的任务数"""
+        return self.scheduler.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        """队列状态及各优先级等待时间"""
+        return {
+            "pending": self.qsize(),
+            "in_flight": self.in_flight,
+            "workers": len(self.workers),
+            "priorities": self.scheduler.stats()
+        }
+
+    async def _worker(self, index: int) -> None:
+        """工作协程：循环取出任务并交给处理函数"""
+        while True:
+            task_id = await self.scheduler.get()
+            self.in_flight += 1
+            try:
+                await self.handler(task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {index} failed on task {task_id}: {str(e)}")
+            finally:
+                self.in_flight -= 1
@@ -0,0 +1,236 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from itertools import islice
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from src.common.config.settings import settings
+from src.database import SessionLocal
+from src.models.task import Task, TaskPriority
+
+logger = logging.getLogger(__name__)
+
+class TaskStore:
+    """有界任务存储
+
+    内存中最多保留 max_tasks 个任务，已结束的任务按 LRU 顺序淘汰，
+    闲置超过 ttl 秒的已结束任务也会被淘汰（在添加、更新和读取时检查）。
+    被淘汰的任务在线程池中写入数据库，fetch/fetch_many 在内存未命中后回落到数据库，
+    数据库读写都不在事件循环中执行。
+    """
+
+    FINISHED_STATUSES = {"completed", "error", "cancelled", "timeout"}
+
+    def __init__(self, max_tasks: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_tasks = max_tasks or settings.TASK_STORE_MAX_TASKS
+        self.ttl = ttl if ttl is not None else settings.TASK_STORE_TTL
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        # 已结束任务按最近访问时间排序，队首即最久未访问
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._counts: Dict[str, int] = {"total": 0}
+        # 已淘汰但尚未写完数据库的任务，写入期间仍可读取
+        self._spilling: Dict[str, Dict[str, Any]] = {}
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(self, task_id: str, entry: Dict[str, Any]) -> None:
+        """添加任务"""
+        self._tasks[task_id] = entry
+        self._counts["total"] += 1
+        self._count(entry.get("status"), 1)
+        if entry.get("status") in self.FINISHED_STATUSES:
+            self._finished[task_id] = time.monotonic()
+        self._evict()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取内存中的任务（不查询数据库），已淘汰的任务返回 None"""
+        self._evict()
+        entry = self._tasks.get(task_id)
+        if entry is not None and task_id in self._finished:
+            self._finished[task_id] = time.monotonic()
+            self._finished.move_to_end(task_id)
+        return entry
+
+    async def fetch(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务，内存未命中时在线程池中从数据库加载"""
+        entry = self.get(task_id)
+        if entry is None:
+            entry = self._spilling.get(task_id)
+        if entry is None:
+            entry = (await asyncio.to_thread(self._load_many, [task_id])).get(task_id)
+        return entry
+
+    async def fetch_many(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取任务，内存未命中的任务在线程池中通过一次数据库查询加载"""
+        found = {}
+        missing = []
+        for task_id in task_ids:
+            entry = self.get(task_id) or self._spilling.get(task_id)
+            if entry is not None:
+                found[task_id] = entry
+            else:
+                missing.append(task_id)
+        if missing:
+            found.update(await asyncio.to_thread(self._load_many, missing))
+        return found
+
+    def update(self, task_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """更新任务字段，状态变化时同步维护计数"""
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return None
+
+        status = fields.get("status")
+        if status is not None and status != entry.get("status"):
+            self._count(entry.get("status"), -1)
+            self._count(status, 1)
+            if status in self.FINISHED_STATUSES:
+                self._finished[task_id] = time.monotonic()
+                self._finished.move_to_end(task_id)
+            else:
+                self._finished.pop(task_id, None)
+
+        entry.update(fields)
+        if status in self.FINISHED_STATUSES:
+            self._evict()
+        return entry
+
+    def counts(self) -> Dict[str, int]:
+        """按状态统计任务数（包含已淘汰到数据库的任务）"""
+        return dict(self._counts)
+
+    def recent(self, limit: int = 100) -> List[Tuple[str, Dict[str, Any]]]:
+        """最近添加的内存任务，按添加时间倒序"""
+        return [
+            (task_id, self._tasks[task_id])
+            for task_id in islice(reversed(self._tasks), limit)
+        ]
+
+    def clear(self) -> None:
+        """清空内存中的任务"""
+        self._tasks = {}
+        self._finished = OrderedDict()
+        self._counts = {"total": 0}
+
+    def _count(self, status: Optional[str], delta: int) -> None:
+        """更新状态计数"""
+        if status is None:
+            return
+        self._counts[status] = self._counts.get(status, 0) + delta
+
+    def _evict(self) -> None:
+        """淘汰过期及超出容量的已结束任务"""
+        evicted = []
+        if self.ttl:
+            deadline = time.monotonic() - self.ttl
+            while self._finished:
+                task_id, last_access = next(iter(self._finished.items()))
+                if last_access > deadline:
+                    break
+                self._finished.popitem(last=False)
+                evicted.append((task_id, self._tasks.pop(task_id)))
+
+        while len(self._tasks) > self.max_tasks and self._finished:
+            task_id, _ = self._finished.popitem(last=False)
+            evicted.append((task_id, self._tasks.pop(task_id)))
+
+        if evicted:
+            self._spill_later(evicted)
+
+    def _spill_later(self, evicted: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """在线程池中写入数据库，没有运行中的事件循环时直接写入"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if not self._spill(evicted):
+                self._restore(evicted)
+            return
+        self._spilling.update(evicted)
+
+        def done(future: "asyncio.Future[bool]") -> None:
+            for task_id, entry in evicted:
+                if self._spilling.get(task_id) is entry:
+                    del self._spilling[task_id]
+            if future.cancelled() or future.exception() or not future.result():
+                self._restore(evicted)
+
+        loop.run_in_executor(None, self._spill, evicted).add_done_callback(done)
+
+    def _restore(self, evicted: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """写入失败时把任务放回内存，下次淘汰时重试"""
+        for task_id, entry in reversed(evicted):
+            if task_id in self._tasks:
+                continue
+            self._tasks[task_id] = entry
+            self._finished[task_id] = time.monotonic()
+            self._finished.move_to_end(task_id, last=False)
+        logger.warning(f"Kept {len(evicted)} evicted tasks in memory after spill failure")
+
+    def _spill(self, evicted: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """将淘汰的任务在一个事务中写入数据库，返回是否成功"""
+        db = SessionLocal()
+        try:
+            for task_id, entry in evicted:
+                task = entry.get("task", {})
+                db.merge(Task(
+                    id=task_id,
+                    name=task.get("name") or task.get("type", "general"),
+                    description=task.get("description") or task.get("content"),
+                    type=task.get("type", "general"),
+                    status=entry.get("status"),
+                    priority=task.get("priority", TaskPriority.MEDIUM.value),
+                    task_metadata=self._to_json(task.get("metadata") or {}),
+                    result=self._to_json(entry.get("result")),
+                    error=entry.get("error"),
+                    progress=100,
+                    created_at=entry.get("created_at")
+                ))
+            db.commit()
+            logger.debug(f"Spilled {len(evicted)} tasks to database")
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to spill tasks to database: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _load_many(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """从数据库批量加载任务"""
+        db = SessionLocal()
+        try:
+            tasks = db.query(Task).filter(Task.id.in_(task_ids)).all()
+            return {
+                task.id: {
+                    "task": {
+                        "task_id": task.id,
+                        "type": task.type,
+                        "content": task.description,
+                        "metadata": task.task_metadata or {}
+                    },
+                    "status": task.status,
+                    "created_at": task.created_at or datetime.now(),
+                    "result": task.result,
+                    "error": task.error
+                }
+                for task in tasks
+            }
+        except Exception as e:
+            logger.error(f"Failed to load tasks from database: {str(e)}")
+            return {}
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_json(value: Any) -> Any:
+        """转换为可写入JSON列的值"""
+        if value is None:
+            return None
+        return json.loads(json.dumps(value, default=str))
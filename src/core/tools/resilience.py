@@ -0,0 +1,235 @@
+from typing import Dict, Any, Awaitable, Callable, Optional, Set, Tuple, Type
+from datetime import datetime
+import asyncio
+import logging
+import random
+import time
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """熔断器打开，工具调用被直接拒绝"""
+
+    def __init__(self, tool_id: str, retry_after: float):
+        super().__init__(f"Circuit open for tool {tool_id}, retry after {retry_after:.1f} seconds")
+        self.tool_id = tool_id
+        self.retry_after = retry_after
+
+class RetryPolicy:
+    """重试策略：指数退避加全抖动，只重试瞬时错误"""
+
+    def __init__(self, max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 retry_on: Tuple[Type[BaseException], ...] = (ConnectionError, asyncio.TimeoutError)):
+        self.max_attempts = max(1, max_attempts or settings.TOOL_RETRY_MAX_ATTEMPTS)
+        self.base_delay = settings.TOOL_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.TOOL_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.retry_on = retry_on
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间（秒），attempt 从1开始"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+class CircuitBreaker:
+    """熔断器
+
+    closed: 正常调用，连续失败 failure_threshold 次后打开；
+    open: 直接拒绝调用，recovery_timeout 秒后进入 half_open；
+    half_open: 只放行一个探测调用，成功后关闭，失败后重新打开。
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, recovery_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or settings.TOOL_BREAKER_FAILURE_THRESHOLD
+        self.recovery_timeout = settings.TOOL_BREAKER_RECOVERY_TIMEOUT if recovery_timeout is None else recovery_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        # 计数器
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.retries = 0
+        self.opened = 0
+        self.last_failure: Optional[str] = None
+        self.last_failure_at: Optional[datetime] = None
+
+    def allow(self) -> bool:
+        """是否放行本次调用，放行时占用半开状态下的探测名额"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+        self.calls += 1
+        return True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            logger.info("Circuit closed after successful probe")
+        self.state = "closed"
+
+    def record_failure(self, error: str) -> None:
+        self._probing = False
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = error
+        self.last_failure_at = datetime.now()
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """调用被取消，不计入成功或失败，只归还探测名额"""
+        self._probing = False
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def reset(self) -> None:
+        """手动关闭熔断器"""
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after": round(self.retry_after(), 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "opened": self.opened,
+            "last_failure": self.last_failure,
+            "last_failure_at": self.last_failure_at.isoformat() if self.last_failure_at else None
+        }
+
+class ToolResilience:
+    """工具调用的重试和熔断
+
+    每个工具的策略由 ToolManager 中的 resilience 元数据声明：
+    - retry: max_attempts / base_delay / max_delay，max_attempts 为1时不重试
+    - breaker: failure_threshold / recovery_timeout，为 False 时不使用熔断器
+    未声明的字段使用 settings 中的默认值。
+
+    工具处理器抛出的异常、以及 status 为 error 且 retryable 为真的结果计为失败；
+    只有 retry_on 中的异常和 retryable 结果会被重试。熔断器按工具在进程内共享。
+    """
+
+    def __init__(self):
+        self.policies: Dict[str, RetryPolicy] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # 不使用熔断器的工具
+        self.unguarded: Set[str] = set()
+
+    def configure(self, tool_id: str, config: Optional[Dict[str, Any]] = None) -> None:
+        """按工具元数据配置重试策略和熔断器，已有熔断器的计数保留"""
+        config = config or {}
+        self.policies[tool_id] = RetryPolicy(**config.get("retry", {}))
+        breaker_config = config.get("breaker", {})
+        if breaker_config is False:
+            self.unguarded.add(tool_id)
+            self.breakers.pop(tool_id, None)
+            return
+        self.unguarded.discard(tool_id)
+        breaker = self.breakers.get(tool_id)
+        if breaker is None:
+            self.breakers[tool_id] = CircuitBreaker(**breaker_config)
+        else:
+            breaker.failure_threshold = breaker_config.get("failure_threshold", breaker.failure_threshold)
+            breaker.recovery_timeout = breaker_config.get("recovery_timeout", breaker.recovery_timeout)
+
+    def breaker(self, tool_id: str) -> CircuitBreaker:
+        if tool_id not in self.breakers:
+            self.configure(tool_id)
+        return self.breakers[tool_id]
+
+    async def call(self, tool_id: str, func: Callable[[], Awaitable[Dict[str, Any]]],
+                   retry: bool = True, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """通过熔断器调用工具，瞬时错误按退避策略重试
+
+        熔断器打开时抛出 CircuitOpenError；deadline 为 time.time() 时间戳，剩余时间不足以等待时不再重试
+        """
+        if tool_id in self.unguarded:
+            return await func()
+        breaker = self.breaker(tool_id)
+        policy = self.policies[tool_id]
+        attempts = policy.max_attempts if retry else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                raise CircuitOpenError(tool_id, breaker.retry_after())
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                breaker.record_failure(str(e))
+                if not isinstance(e, policy.retry_on) or not await self._backoff(breaker, policy, attempt, attempts, deadline):
+                    raise
+                logger.warning(f"Tool {tool_id} attempt {attempt} failed, retrying: {str(e)}")
+                continue
+
+            if isinstance(result, dict) and result.get("status") == "error" and result.get("retryable"):
+                breaker.record_failure(str(result.get("error")))
+                if not await self._backoff(breaker, policy, attempt, attempts, deadline):
+                    return {**result, "attempts": attempt}
+                logger.warning(f"Tool {tool_id} attempt {attempt} failed, retrying: {result.get('error')}")
+                continue
+
+            breaker.record_success()
+            return result if attempt == 1 else {**result, "attempts": attempt}
+
+    def record_failure(self, tool_id: str, error: str) -> None:
+        """记录在调用之外判定的失败（例如整体超时）"""
+        if tool_id not in self.unguarded:
+            self.breaker(tool_id).record_failure(error)
+
+    def reset(self, tool_id: str) -> bool:
+        breaker = self.breakers.get(tool_id)
+        if breaker is None:
+            return False
+        breaker.reset()
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            tool_id: {
+                **breaker.stats(),
+                "max_attempts": self.policies[tool_id].max_attempts
+            }
+            for tool_id, breaker in self.breakers.items()
+        }
+
+    async def _backoff(self, breaker: CircuitBreaker, policy: RetryPolicy, attempt: int,
+                       attempts: int, deadline: Optional[float]) -> bool:
+        """等待退避时间，返回是否继续重试"""
+        if attempt >= attempts or breaker.state == "open":
+            return False
+        delay = policy.delay(attempt)
+        if deadline is not None and time.time() + delay >= deadline:
+            return False
+        breaker.retries += 1
+        await asyncio.sleep(delay)
+        return True
+
+# 进程内共享的工具重试和熔断状态
+tool_resilience = ToolResilience()
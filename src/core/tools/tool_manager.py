@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Type, Callable
 import logging
 from datetime import datetime
 import importlib
@@ -12,8 +12,14 @@ class ToolManager:
     
     def __init__(self):
         self.tools: Dict[str, Dict[str, Any]] = {}
+        self.tool_classes: Dict[str, Type] = {}
         self.tool_instances: Dict[str, Any] = {}
         self.event_bus = EventBus()
+        self._register_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def on_register(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """注册工具时回调 listener(工具信息)，用于重建依赖工具元数据的索引"""
+        self._register_listeners.append(listener)
 
     def initialize(self) -> None:
         """初始化工具链管理器"""
@@ -26,7 +32,12 @@ class ToolManager:
             raise
 
     def _register_builtin_tools(self) -> None:
-        """注册内置工具"""
+        """注册内置工具
+
+        selection 声明工具选择规则：task_types 为直接使用该工具的任务类型，
+        其余任务按 keywords（不区分大小写的子串）和 patterns（正则）匹配任务内容；
+        resilience 声明重试（retry）和熔断（breaker）参数，见 ToolResilience
+        """
         from src.agents.executor.tools.code_runner import CodeRunner
         from src.agents.executor.tools.file_processor import FileProcessor
         from src.agents.executor.tools.network_tool import NetworkTool
@@ -38,28 +49,52 @@ class ToolManager:
                 "description": "执行Python代码",
                 "class": CodeRunner,
                 "type": "code",
-                "async": True
+                "async": True,
+                "selection": {
+                    "task_types": ["code_analysis"],
+                    "keywords": ["code", "python"]
+                },
+                # 用户代码可能有副作用，不重试；超时和执行错误来自用户代码而不是工具故障，不熔断
+                "resilience": {"retry": {"max_attempts": 1}, "breaker": False}
             },
             "file_processor": {
                 "name": "文件处理器",
                 "description": "处理文件操作",
                 "class": FileProcessor,
                 "type": "file",
-                "async": True
+                "async": True,
+                "selection": {
+                    "task_types": ["file_operation", "data_processing"],
+                    "keywords": ["file", "data"]
+                },
+                "resilience": {"retry": {"max_attempts": 1}}
             },
             "network_tool": {
                 "name": "网络工具",
                 "description": "处理网络请求",
                 "class": NetworkTool,
                 "type": "network",
-                "async": True
+                "async": True,
+                "selection": {
+                    "task_types": ["network_request"],
+                    "keywords": ["http", "api"]
+                },
+                "resilience": {
+                    "retry": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 5.0},
+                    "breaker": {"failure_threshold": 5, "recovery_timeout": 30.0}
+                }
             },
             "data_analyzer": {
                 "name": "数据分析器",
                 "description": "分析数据",
                 "class": DataAnalyzer,
                 "type": "data",
-                "async": True
+                "async": True,
+                "selection": {
+                    "task_types": ["code_analysis", "data_processing"],
+                    "keywords": ["analyze", "statistics"]
+                },
+                "resilience": {"retry": {"max_attempts": 1}}
             }
         }
         
@@ -67,21 +102,22 @@ class ToolManager:
             self.register_tool(tool_id, tool_info)
 
     def register_tool(self, tool_id: str, tool_info: Dict[str, Any]) -> None:
-        """注册工具"""
+        """注册工具，工具实例在首次使用时创建"""
         try:
-            # 创建工具实例
-            tool_class = tool_info["class"]
-            tool_instance = tool_class()
-            
             # 存储工具信息
             self.tools[tool_id] = {
                 "id": tool_id,
                 "name": tool_info["name"],
                 "description": tool_info["description"],
                 "type": tool_info["type"],
-                "async": tool_info.get("async", False)
+                "async": tool_info.get("async", False),
+                "selection": tool_info.get("selection", {}),
+                "resilience": tool_info.get("resilience", {})
             }
-            self.tool_instances[tool_id] = tool_instance
+            self.tool_classes[tool_id] = tool_info["class"]
+            self.tool_instances.pop(tool_id, None)
+            for listener in self._register_listeners:
+                listener(self.tools[tool_id])
             
             logger.info(f"Tool {tool_id} registered")
         except Exception as e:
@@ -94,6 +130,8 @@ class ToolManager:
 
     def get_tool_instance(self, tool_id: str) -> Optional[Any]:
         """获取工具实例"""
+        if tool_id not in self.tool_instances and tool_id in self.tool_classes:
+            self.tool_instances[tool_id] = self.tool_classes[tool_id]()
         return self.tool_instances.get(tool_id)
 
     def list_tools(self) -> List[Dict[str, Any]]:
@@ -143,6 +181,7 @@ class ToolManager:
                     tool_instance.cleanup()
             
             self.tools.clear()
+            self.tool_classes.clear()
             self.tool_instances.clear()
             logger.info("Tool manager cleaned up")
         except Exception as e:
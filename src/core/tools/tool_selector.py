@@ -0,0 +1,145 @@
+from typing import Dict, Any, List, Optional, Pattern, Tuple
+from collections import OrderedDict
+import logging
+import re
+
+from src.common.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ToolSelector:
+    """基于工具元数据的工具选择
+
+    每个工具在 ToolManager 中声明 selection 元数据：
+    - task_types: 直接使用该工具的任务类型
+    - keywords: 内容中出现即选中的关键词（不区分大小写的子串匹配）
+    - patterns: 正则表达式（不区分大小写）
+
+    任务类型通过索引直接查找；其余任务的内容只转换一次小写，所有工具的关键词合并为一个
+    预编译的正则扫描，命中的关键词通过索引映射回工具；正则同样合并为一个，命中后在命中位置
+    逐个尝试各工具的正则确定所属工具。注册新工具时通过 add 重建，
+    相同任务类型和内容的选择结果会被缓存。
+    """
+
+    # 缓存的候选组合正则数量上限
+    MAX_COMPILED = 64
+
+    def __init__(self, tools: List[Dict[str, Any]], cache_size: Optional[int] = None):
+        self.cache_size = cache_size or settings.TOOL_SELECTION_CACHE_SIZE
+        self._tools: "OrderedDict[str, Dict[str, Any]]" = OrderedDict(
+            (tool["id"], tool) for tool in tools
+        )
+        self._cache: "OrderedDict[Tuple[str, int, int], List[str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._build()
+
+    def add(self, tool: Dict[str, Any]) -> None:
+        """添加或替换工具的选择规则，重建索引和正则"""
+        self._tools[tool["id"]] = tool
+        self._build()
+
+    def select(self, task_type: str, content: Any) -> List[str]:
+        """返回选中的工具ID，按工具注册顺序排列"""
+        if task_type in self._by_type:
+            return list(self._by_type[task_type])
+
+        if not isinstance(content, str):
+            content = str(content or "")
+        key = (task_type, len(content), hash(content))
+        selected = self._cache.get(key)
+        if selected is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return list(selected)
+
+        self.misses += 1
+        selected = self._scan(content)
+        self._cache[key] = selected
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return list(selected)
+
+    def stats(self) -> Dict[str, Any]:
+        """选择缓存统计"""
+        return {
+            "tools": len(self._tools),
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._cache)
+        }
+
+    def _build(self) -> None:
+        """根据工具元数据建立任务类型索引、关键词索引和每个工具的正则"""
+        self._by_type: Dict[str, List[str]] = {}
+        # 小写关键词 -> 声明该关键词的工具
+        self._keywords: Dict[str, List[str]] = {}
+        # 按注册顺序保存声明了正则的工具及其合并后的正则
+        self._patterns: "OrderedDict[str, Pattern]" = OrderedDict()
+        for tool_id, tool in self._tools.items():
+            selection = tool.get("selection") or {}
+            for task_type in selection.get("task_types", []):
+                self._by_type.setdefault(task_type, []).append(tool_id)
+            for keyword in selection.get("keywords", []):
+                self._keywords.setdefault(keyword.lower(), []).append(tool_id)
+            patterns = selection.get("patterns", [])
+            if patterns:
+                self._patterns[tool_id] = re.compile(
+                    "|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE
+                )
+
+        self._order = {tool_id: index for index, tool_id in enumerate(self._tools)}
+        self._compiled: Dict[Tuple[str, Tuple[str, ...]], Pattern] = {}
+        self._cache.clear()
+
+    def _alternation(self, kind: str, candidates: Tuple[str, ...]) -> Pattern:
+        """候选关键词或候选工具正则合并成的单个正则
+
+        不使用分组，保留正则引擎对首字符集合的快速跳过；命中后再映射回工具。
+        """
+        key = (kind, candidates)
+        pattern = self._compiled.get(key)
+        if pattern is None:
+            if len(self._compiled) >= self.MAX_COMPILED:
+                self._compiled.clear()
+            if kind == "keywords":
+                # 长关键词在前，同一位置优先匹配完整的关键词
+                pattern = re.compile("|".join(re.escape(k) for k in sorted(candidates, key=len, reverse=True)))
+            else:
+                pattern = re.compile(
+                    "|".join(f"(?:{self._patterns[t].pattern})" for t in candidates), re.IGNORECASE
+                )
+            self._compiled[key] = pattern
+        return pattern
+
+    def _scan(self, content: str) -> List[str]:
+        """扫描内容，返回命中的工具ID
+
+        命中后把对应的候选从合并正则中去掉，再从命中位置继续查找，
+        与同一位置重叠的其他候选不会被漏掉。
+        """
+        matched = set()
+
+        keywords = tuple(self._keywords)
+        lowered = content.lower() if keywords else ""
+        position = 0
+        while keywords:
+            match = self._alternation("keywords", keywords).search(lowered, position)
+            if match is None:
+                break
+            matched.update(self._keywords[match.group()])
+            keywords = tuple(k for k in keywords if not matched.issuperset(self._keywords[k]))
+            position = match.start()
+
+        candidates = tuple(t for t in self._patterns if t not in matched)
+        position = 0
+        while candidates:
+            match = self._alternation("patterns", candidates).search(content, position)
+            if match is None:
+                break
+            tool_id = next(t for t in candidates if self._patterns[t].match(content, match.start()))
+            matched.add(tool_id)
+            candidates = tuple(t for t in candidates if t != tool_id)
+            position = match.start()
+
+        return sorted(matched, key=self._order.__getitem__)
@@ -1,7 +1,8 @@
  
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 import json
 import logging
+import redis.asyncio as aioredis
 from src.common.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -20,9 +21,11 @@ class CacheManager:
                 encoding="utf-8",
                 decode_responses=True
             )
+            await self.redis.ping()
             logger.info("Redis connection initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Redis: {str(e)}")
+            self.redis = None
             raise
 
     async def set(self, key: str, value: Any, expire: int = None) -> bool:
@@ -83,6 +86,52 @@ class CacheManager:
             logger.error(f"Failed to set expiry for key {key}: {str(e)}")
             return False
 
+    async def get_many(self, keys: List[str]) -> List[Any]:
+        """批量获取缓存"""
+        try:
+            values = await self.redis.mget(keys)
+            results = []
+            for value in values:
+                try:
+                    results.append(json.loads(value) if value is not None else None)
+                except json.JSONDecodeError:
+                    results.append(value)
+            return results
+        except Exception as e:
+            logger.error(f"Failed to get cache keys: {str(e)}")
+            return [None] * len(keys)
+
+    async def push(self, key: str, *values: Any) -> Optional[int]:
+        """向列表头部追加元素"""
+        try:
+            values = [json.dumps(v) if isinstance(v, (dict, list)) else v for v in values]
+            return await self.redis.lpush(key, *values)
+        except Exception as e:
+            logger.error(f"Failed to push to list {key}: {str(e)}")
+            return None
+
+    async def pop(self, keys: List[str], timeout: int = 1) -> Optional[Any]:
+        """按 keys 顺序从第一个非空列表尾部阻塞弹出元素，超时返回 None"""
+        try:
+            item = await self.redis.brpop(keys, timeout=timeout)
+            if item is None:
+                return None
+            try:
+                return json.loads(item[1])
+            except json.JSONDecodeError:
+                return item[1]
+        except Exception as e:
+            logger.error(f"Failed to pop from lists {keys}: {str(e)}")
+            return None
+
+    async def length(self, key: str) -> int:
+        """获取列表长度"""
+        try:
+            return await self.redis.llen(key)
+        except Exception as e:
+            logger.error(f"Failed to get length of list {key}: {str(e)}")
+            return 0
+
     async def cleanup(self) -> None:
         """清理Redis连接"""
         if self.redis:
@@ -0,0 +1,140 @@
+from typing import Optional, Any, Dict, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import time
+
+from src.common.config.settings import settings
+from .manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """任务结果缓存
+
+    以规范化后的整个任务（去掉 VOLATILE_FIELDS 中与结果无关的字段）的哈希作为键。
+    进程内LRU缓存作为一级缓存；Redis可用时通过 CacheManager 作为二级缓存，
+    不可用时仅使用进程内缓存。Redis 命中的结果按剩余有效期提升到进程内缓存。
+
+    metadata 中 no_cache 为真时不使用缓存；未配置缓存时间的任务类型（如执行用户代码的
+    code_analysis）只在 metadata 中 cache 为真时按 RESULT_CACHE_OPT_IN_TTL 缓存。
+    """
+
+    KEY_PREFIX = "task_result:"
+    OPT_OUT_FLAG = "no_cache"
+    OPT_IN_FLAG = "cache"
+    # 名称、描述以及只影响调度和执行方式的字段不影响结果，不参与指纹计算
+    VOLATILE_FIELDS = frozenset({
+        "task_id", "name", "description", "priority", "timeout", "deadline", "stream", "retry"
+    })
+
+    def __init__(self, cache_manager: Optional[CacheManager] = None,
+                 ttls: Optional[Dict[str, int]] = None, default_ttl: Optional[int] = None,
+                 max_local_entries: Optional[int] = None):
+        self.cache_manager = cache_manager or CacheManager()
+        self.ttls = ttls if ttls is not None else settings.RESULT_CACHE_TTLS
+        self.default_ttl = default_ttl if default_ttl is not None else settings.RESULT_CACHE_DEFAULT_TTL
+        self.max_local_entries = max_local_entries or settings.RESULT_CACHE_MAX_LOCAL_ENTRIES
+        self.remote_enabled = False
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def initialize(self) -> None:
+        """连接Redis，失败时回退到进程内缓存"""
+        try:
+            await self.cache_manager.initialize()
+            self.remote_enabled = True
+        except Exception as e:
+            self.remote_enabled = False
+            logger.warning(f"Result cache falling back to in-process storage: {str(e)}")
+
+    async def cleanup(self) -> None:
+        """清理资源"""
+        self._local.clear()
+        if self.remote_enabled:
+            await self.cache_manager.cleanup()
+            self.remote_enabled = False
+
+    def ttl_for(self, task: Dict[str, Any]) -> int:
+        """获取任务的缓存时间，0 表示不缓存"""
+        metadata = task.get("metadata") or {}
+        if metadata.get(self.OPT_OUT_FLAG):
+            return 0
+        ttl = self.ttls.get(task.get("type", "general"), self.default_ttl)
+        if ttl <= 0 and metadata.get(self.OPT_IN_FLAG):
+            return settings.RESULT_CACHE_OPT_IN_TTL
+        return ttl
+
+    def is_cacheable(self, task: Dict[str, Any]) -> bool:
+        """判断任务是否允许使用缓存"""
+        if not settings.RESULT_CACHE_ENABLED:
+            return False
+        return self.ttl_for(task) > 0
+
+    def fingerprint(self, task: Dict[str, Any]) -> str:
+        """计算规范化任务的内容哈希"""
+        fields = {key: value for key, value in task.items() if key not in self.VOLATILE_FIELDS}
+        fields["type"] = task.get("type", "general")
+        fields["content"] = task.get("content", "")
+        fields["metadata"] = task.get("metadata") or {}
+        normalized = json.dumps(
+            fields,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """读取缓存结果"""
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._local[key]
+
+        if self.remote_enabled:
+            entry = await self.cache_manager.get(self.KEY_PREFIX + key)
+            if isinstance(entry, dict) and "expires_at" in entry:
+                ttl = entry["expires_at"] - time.time()
+                if ttl > 0:
+                    self._set_local(key, entry["result"], ttl)
+                    self.hits += 1
+                    return entry["result"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """写入缓存结果"""
+        if ttl <= 0:
+            return
+        self._set_local(key, value, ttl)
+
+        if self.remote_enabled:
+            # 记录过期时间，其他进程命中时按剩余有效期写入进程内缓存
+            entry = {"expires_at": time.time() + ttl, "result": value}
+            await self.cache_manager.set(self.KEY_PREFIX + key, entry, expire=ttl)
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> None:
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self.remote_enabled else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self._local)
+        }
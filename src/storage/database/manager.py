@@ -17,7 +17,9 @@ class DatabaseManager:
             echo=settings.DEBUG,
             poolclass=QueuePool,
             pool_size=5,
-            max_overflow=10
+            max_overflow=10,
+            # 连接会在线程池中使用（asyncio.to_thread）
+            connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
         )
         self.SessionLocal = sessionmaker(
             autocommit=False,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,19 +6,28 @@ from datetime import datetime
 Base = declarative_base()
 
 class Task(Base):
-    """任务表"""
+    """任务表
+
+    与 src.models.task.Task 共用 tasks 表，列定义必须保持一致，
+    否则先执行 create_all 的一方会建出另一方无法写入的表。
+    """
     __tablename__ = "tasks"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(String(36), primary_key=True, index=True)
+    name = Column(String(255), nullable=False, default="")
+    description = Column(Text, nullable=True)
     type = Column(String(50), nullable=False)
     status = Column(String(20), nullable=False)
+    priority = Column(String(20), nullable=False, default="medium")
+    task_metadata = Column(JSON)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    task_metadata = Column(JSON)
 
     # 关联
     agent_states = relationship("AgentState", back_populates="task")
-    execution_logs = relationship("ExecutionLog", back_populates="task")
 
 class AgentState(Base):
     """代理状态表"""
@@ -26,7 +35,7 @@ class AgentState(Base):
 
     id = Column(Integer, primary_key=True)
     agent_id = Column(String(50), nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
+    task_id = Column(String(36), ForeignKey("tasks.id"))
     state = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
 
@@ -38,11 +47,9 @@ class ExecutionLog(Base):
     __tablename__ = "execution_logs"
 
     id = Column(Integer, primary_key=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
+    # 控制器任务ID（UUID），任务可能只存在于内存中，不设外键
+    task_id = Column(String(36), index=True)
     agent_id = Column(String(50), nullable=False)
     action = Column(String(100), nullable=False)
     result = Column(JSON)
-    created_at = Column(DateTime, default=datetime.now)
-
-    # 关联
-    task = relationship("Task", back_populates="execution_logs")
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file